@@ -0,0 +1,74 @@
+"""
+Append latency and fsync batching of the meal log under concurrent sessions.
+
+Compares one fsync per append (appends serialized, so every record is its own
+batch) with group commit at the default commit window (0: write as soon as the
+flusher is idle) and with a few extra commit windows.
+
+Usage:
+    python benchmarks/bench_meal_log.py [--sessions 32] [--appends 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from meal_log import MealLog  # noqa: E402
+
+ENTRY = {"date": "2024-01-01", "time": "08:00", "food": "Dry Kibble (Standard)", "quantity": "1 cup", "calories": 350}
+
+
+def run(label: str, commit_window: float, sessions: int, appends: int, serialize: bool = False) -> None:
+    log = MealLog(tempfile.mkdtemp(prefix="pawpal_wal_"), commit_window=commit_window)
+    latencies: list[float] = []
+    lock = threading.Lock()
+    one_at_a_time = threading.Lock()
+
+    def append(owner: str) -> None:
+        if serialize:
+            with one_at_a_time:
+                log.append(owner, [ENTRY])
+        else:
+            log.append(owner, [ENTRY])
+
+    def session(i: int) -> None:
+        mine = []
+        for _ in range(appends):
+            started = time.perf_counter()
+            append(f"owner{i}")
+            mine.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(mine)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    log.close()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<22} {len(latencies) / elapsed:8.0f} appends/s  {len(latencies) / log.batches_written:6.1f} appends/fsync  "
+          f"p50={statistics.median(latencies):6.2f} ms  p99={p99:6.2f} ms  max={latencies[-1]:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--appends", type=int, default=50)
+    args = parser.parse_args()
+    print(f"sessions={args.sessions} appends/session={args.appends}")
+    run("fsync per append", 0.0, args.sessions, args.appends, serialize=True)
+    for window in (0.0, 0.002, 0.005):
+        run(f"group, window {window * 1000:.0f} ms", window, args.sessions, args.appends)
+
+
+if __name__ == "__main__":
+    main()
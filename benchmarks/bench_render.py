@@ -0,0 +1,114 @@
+"""
+Server CPU time of PawPal script runs with a large log and long chat.
+
+Runs the app headlessly through Streamlit's AppTest, seeds session_state with
+many food logs and chat turns, then triggers common interactions.
+
+AppTest always reruns the whole script, even for widgets inside an
+st.fragment, so every "full run" column is a full rerun. It is not the cost of
+that interaction in a live server. The "tab body" column is the app's own
+timing (render_cpu_ms) of the fragment the widget lives in. That is the code
+a live server executes on a fragment-only rerun, excluding Streamlit's own
+per-rerun overhead. Compare the two columns side by side, not as a
+measured saving.
+
+The "gauge" lines report the dashboard gauge's in-app cost (build or cache
+lookup plus st.plotly_chart). Plain reruns hit the gauge cache. Logging food
+changes the consumed total, so those reruns build a new figure.
+
+Usage:
+    python benchmarks/bench_render.py [--logs 2000] [--chat 400] [--repeat 5]
+"""
+import argparse
+import datetime
+import os
+import statistics
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pawproject.py")
+
+
+def make_app(n_logs: int, n_chat: int) -> AppTest:
+    os.environ.setdefault("PAWPAL_DATA_DIR", tempfile.mkdtemp(prefix="pawpal_bench_"))
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.secrets["OPENROUTER_API_KEY"] = ""  # no network: the vet tab answers with the "not configured" notice
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    at.session_state["food_logs"] = [
+        {"date": today, "time": "08:00", "food": "Dry Kibble (Standard)", "quantity": "1 cup", "calories": 350}
+        for _ in range(n_logs)
+    ]
+    at.session_state["logs_version"] = 1
+    at.session_state["chat_history"] = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"Message {i} about safe dog treats."}
+        for i in range(n_chat)
+    ]
+    return at
+
+
+def timed(action) -> float:
+    started = time.process_time()
+    action()
+    return (time.process_time() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logs", type=int, default=2000)
+    parser.add_argument("--chat", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    at = make_app(args.logs, args.chat)
+    first_ms = timed(at.run)
+
+    def rerun():
+        at.run()
+
+    def chat():
+        at.chat_input[0].set_value("Can my dog eat carrots?").run()
+
+    def change_category():
+        box = at.selectbox(key="category_select_tab2")
+        box.set_value(box.options[(box.options.index(box.value) + 1) % len(box.options)]).run()
+
+    def log_food():
+        next(b for b in at.button if b.label == "Log Selected Food").click().run()
+
+    # (label, action, fragment it lives in or None, whether a live server reruns only that fragment)
+    interactions = [
+        ("plain rerun", rerun, None, False),
+        ("chat message", chat, "Vet chat tab", True),
+        ("change category", change_category, "Add Food tab", True),
+        ("log selected food", log_food, "Add Food tab", False),  # calls st.rerun() so the dashboard updates
+    ]
+
+    print(f"logs={args.logs} chat={args.chat} repeat={args.repeat}")
+    print(f"first render: {first_ms:.1f} ms CPU")
+    gauge_ms: dict[str, list[float]] = {}
+    print(f"{'interaction':<20} {'full run (AppTest)':>20} {'tab body (in-app)':>20}  live server reruns")
+    for label, action, tab, fragment_only in interactions:
+        samples, tab_samples = [], []
+        for _ in range(args.repeat):
+            samples.append(timed(action))
+            if tab:
+                tab_samples.append(at.session_state["render_cpu_ms"][tab])
+            gauge_ms.setdefault(label, []).append(at.session_state["render_cpu_ms"]["Dashboard gauge"])
+        if at.exception:
+            raise SystemExit(f"app raised during '{label}': {at.exception}")
+        tab_col = f"{statistics.median(tab_samples):17.1f} ms" if tab else f"{'-':>20}"
+        scope = f"only {tab}" if fragment_only else "whole script"
+        print(f"{label:<20} {statistics.median(samples):17.1f} ms {tab_col}  {scope}")
+
+    print(f"gauge, cached figure (plain rerun):    {statistics.median(gauge_ms['plain rerun']):6.2f} ms (median, in-app)")
+    print(f"gauge, new figure (log selected food): {statistics.median(gauge_ms['log selected food']):6.2f} ms (median, in-app)")
+
+    print("app-side timings (last run):")
+    for label, ms in at.session_state["render_cpu_ms"].items():
+        print(f"  {label:<18} {ms:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Time to first render for cold, warm and returning sessions.
+
+- cold: first session in a fresh process (process-level caches empty)
+- new: later sessions without an owner id (warm process, default profile)
+- returning: sessions that come back with ?owner=... and restore their snapshot
+
+Usage:
+    python benchmarks/bench_warm_start.py [--sessions 10] [--chat 50]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pawproject.py")
+
+
+def first_render(owner: str | None = None) -> tuple[AppTest, float, float]:
+    """Run one new session; returns (app, wall ms measured here, app-reported first_render_ms)."""
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.secrets["OPENROUTER_API_KEY"] = ""
+    if owner:
+        at.query_params["owner"] = owner
+    started = time.perf_counter()
+    at.run()
+    wall_ms = (time.perf_counter() - started) * 1000
+    if at.exception:
+        raise SystemExit(f"app raised: {at.exception[0].message}")
+    return at, wall_ms, at.session_state["first_render_ms"]
+
+
+def report(label: str, samples: list[tuple[float, float]]) -> None:
+    wall = [s[0] for s in samples]
+    app = [s[1] for s in samples]
+    print(f"{label:<10} n={len(samples):<3} wall p50 {statistics.median(wall):7.1f} ms   "
+          f"in-app p50 {statistics.median(app):7.1f} ms  max {max(app):7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--chat", type=int, default=50, help="chat messages in each returning owner's history")
+    args = parser.parse_args()
+    os.environ.setdefault("PAWPAL_DATA_DIR", tempfile.mkdtemp(prefix="pawpal_warm_"))
+
+    at, wall, app = first_render()
+    report("cold", [(wall, app)])
+
+    report("new", [first_render()[1:] for _ in range(args.sessions)])
+
+    # Seed returning owners: a non-default profile and a chat history, saved as snapshots
+    owners = []
+    for i in range(args.sessions):
+        at, _, _ = first_render()
+        at.session_state["chat_history"] = [
+            {"role": "user" if j % 2 == 0 else "assistant", "content": f"Message {j}"} for j in range(args.chat)
+        ]
+        at.text_input[0].set_value(f"Dog {i}").run()
+        owners.append((at.session_state["owner_id"], f"Dog {i}"))
+
+    samples = []
+    for owner, name in owners:
+        at, wall, app = first_render(owner)
+        if at.session_state["dog_profile"]["name"] != name or not at.session_state["chat_history"]:
+            raise SystemExit(f"owner {owner} was not restored from its snapshot")
+        samples.append((wall, app))
+    report("returning", samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Synthetic load and soak test for PawPal.
+
+Drives the app headlessly with Streamlit's AppTest. Each scripted session
+logs food through both Add Food paths, chats with the vet assistant (served by
+a local fake OpenRouter endpoint), changes the profile and checks the
+dashboard.
+
+Within a process, `--interleave` sessions are kept alive at once and advanced
+round-robin, one rerun at a time. They share cache_resource objects (e.g.
+the meal log) as sessions on one server instance do. But no two reruns ever
+overlap (AppTest swaps process-global state such as st.secrets while it runs,
+so reruns cannot run on threads), so this alone measures per-rerun cost and
+memory, not a scaling limit.
+
+`--processes N` runs sessions in N worker processes at the same time, so
+reruns really do overlap and compete for cores and the fake endpoint.
+sessions/s is then measured on wall time across all workers; run it with
+increasing N to find where throughput stops scaling. Each worker has its own
+data directory (a meal log directory has a single writer), so contention on
+one shared meal log is measured by benchmarks/bench_meal_log.py, not here.
+
+Reports sessions/sec, rerun latency percentiles per step, and memory per
+session: process RSS growth and the pickled size of session_state.
+
+Usage:
+    python benchmarks/loadtest.py [--sessions 40] [--interleave 4] [--processes 1] [--chat-turns 3] [--fake-delay 0.05]
+"""
+import argparse
+import gc
+import http.server
+import json
+import multiprocessing
+import os
+import pickle
+import statistics
+import tempfile
+import threading
+import time
+from collections import deque
+
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pawproject.py")
+TYPED_MEALS = [
+    "1 cup boiled chicken breast + 1 tbsp peanut butter",
+    "1/2 cup white rice, 1 medium carrot",
+    "2 cups dry kibble",
+]
+QUESTIONS = ["Can my dog eat carrots?", "How much kibble per day?", "Is pumpkin safe?"]
+
+
+# --- FAKE OPENROUTER ---
+
+class FakeOpenRouterHandler(http.server.BaseHTTPRequestHandler):
+    delay = 0.0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        time.sleep(self.delay)
+        question = body["messages"][-1]["content"]
+        payload = json.dumps({"choices": [{"message": {"content": f"Fake vet answer to: {question}"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_openrouter(delay: float) -> http.server.ThreadingHTTPServer:
+    handler = type("Handler", (FakeOpenRouterHandler,), {"delay": delay})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --- MEASUREMENT ---
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource  # peak rather than current RSS, but still shows growth
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def session_state_bytes(at: AppTest) -> int:
+    state = {k: v for k, v in at.session_state.to_dict().items() if not k.startswith("$$")}
+    try:
+        return len(pickle.dumps(state))
+    except Exception:
+        return len(repr(state))
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.state_bytes: list[int] = []
+        self.errors: list[str] = []
+
+    def add(self, step: str, ms: float):
+        self.latencies.setdefault(step, []).append(ms)
+
+
+# --- SCRIPTED SESSION ---
+
+def session_steps(n: int, chat_turns: int, stats: Stats):
+    """Generator that performs one scripted session, yielding after each step."""
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.secrets["OPENROUTER_API_KEY"] = "fake-key"
+
+    def step(name, action):
+        started = time.perf_counter()
+        action()
+        stats.add(name, (time.perf_counter() - started) * 1000)
+        if at.exception:
+            raise RuntimeError(f"session {n}, step '{name}': {at.exception[0].message}")
+
+    def log_selected():
+        category = at.selectbox(key="category_select_tab2")
+        category.set_value(category.options[n % len(category.options)]).run()
+        item = at.selectbox(key="food_item_select_tab2")
+        item.set_value(item.options[n % len(item.options)])
+        next(b for b in at.button if b.label == "Log Selected Food").click().run()
+
+    def log_typed():
+        at.text_area(key="free_text_tab2").set_value(TYPED_MEALS[n % len(TYPED_MEALS)])
+        next(b for b in at.button if b.label == "Estimate & Log Typed Meal").click().run()
+
+    def change_weight():
+        weight = next(w for w in at.number_input if w.label == "Weight (kg)")
+        weight.set_value(weight.value + 0.5).run()
+
+    step("first render", at.run)
+    yield
+    step("log selected food", log_selected)
+    yield
+    step("log typed meal", log_typed)
+    yield
+    for i in range(chat_turns):
+        step("chat", lambda: at.chat_input[0].set_value(QUESTIONS[i % len(QUESTIONS)]).run())
+        yield
+    step("change profile", change_weight)
+
+    consumed = next(m for m in at.metric if m.label == "Consumed").value
+    if consumed == "0 kcal":
+        raise RuntimeError(f"session {n}: dashboard shows nothing consumed after logging")
+    if not at.session_state["chat_history"][-1]["content"].startswith("Fake vet answer"):
+        raise RuntimeError(f"session {n}: chat did not reach the fake endpoint")
+    stats.state_bytes.append(session_state_bytes(at))
+
+
+def run_wave(first: int, count: int, interleave: int, chat_turns: int, stats: Stats) -> float:
+    """Run `count` sessions, `interleave` alive at once, round-robin; returns elapsed seconds."""
+    pending = iter(range(first, first + count))
+    live = deque()
+    started = time.perf_counter()
+    while True:
+        while len(live) < interleave and (n := next(pending, None)) is not None:
+            live.append((n, session_steps(n, chat_turns, stats)))
+        if not live:
+            break
+        n, session = live.popleft()
+        try:
+            next(session)
+            live.append((n, session))
+        except StopIteration:
+            pass
+        except Exception as e:
+            stats.errors.append(str(e))
+    return time.perf_counter() - started
+
+
+def worker(worker_no: int, sessions: int, args: argparse.Namespace, barrier, results) -> None:
+    """One process of a --processes run: warm up, wait for the others, then run its share of sessions."""
+    os.environ["PAWPAL_DATA_DIR"] = tempfile.mkdtemp(prefix=f"pawpal_load_w{worker_no}_")
+    first = worker_no * (args.warmup + sessions)
+    warm = Stats()
+    run_wave(first, args.warmup, args.interleave, args.chat_turns, warm)
+    barrier.wait()  # measured sessions start together in every worker
+    stats = Stats()
+    run_wave(first + args.warmup, sessions, args.interleave, args.chat_turns, stats)
+    stats.errors[:0] = [f"warm-up: {e}" for e in warm.errors]
+    results.put((stats, rss_bytes()))
+
+
+def run_processes(args: argparse.Namespace) -> tuple[Stats, float, list[int]]:
+    """Run args.sessions across args.processes workers; returns (merged stats, wall seconds, RSS per worker)."""
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(args.processes + 1)
+    results = ctx.Queue()
+    shares = [args.sessions // args.processes + (i < args.sessions % args.processes) for i in range(args.processes)]
+    procs = [ctx.Process(target=worker, args=(i, shares[i], args, barrier, results)) for i in range(args.processes)]
+    for p in procs:
+        p.start()
+    barrier.wait()
+    started = time.perf_counter()
+    merged, rss = Stats(), []
+    for _ in procs:
+        stats, worker_rss = results.get()
+        for step, samples in stats.latencies.items():
+            merged.latencies.setdefault(step, []).extend(samples)
+        merged.state_bytes.extend(stats.state_bytes)
+        merged.errors.extend(stats.errors)
+        rss.append(worker_rss)
+    elapsed = time.perf_counter() - started
+    for p in procs:
+        p.join()
+    return merged, elapsed, rss
+
+
+def print_latencies(stats: Stats) -> None:
+    print(f"{'rerun latency (ms)':<20} {'n':>5} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for step, samples in stats.latencies.items():
+        print(f"{step:<20} {len(samples):>5} {percentile(samples, 0.5):8.1f} {percentile(samples, 0.9):8.1f} "
+              f"{percentile(samples, 0.99):8.1f} {max(samples):8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=40, help="measured sessions (after warm-up), across all processes")
+    parser.add_argument("--interleave", type=int, default=4,
+                        help="sessions alive at once per process, advanced one rerun at a time (they never overlap)")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes running sessions in parallel")
+    parser.add_argument("--chat-turns", type=int, default=3)
+    parser.add_argument("--fake-delay", type=float, default=0.05, help="seconds the fake endpoint takes to answer")
+    parser.add_argument("--warmup", type=int, default=4, help="warm-up sessions (per process)")
+    parser.add_argument("--waves", type=int, default=4, help="RSS is sampled after each wave (single process only)")
+    args = parser.parse_args()
+
+    server = start_fake_openrouter(args.fake_delay)
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/api/v1"
+    mb = 1024 * 1024
+
+    if args.processes > 1:
+        stats, elapsed, rss = run_processes(args)
+        server.shutdown()
+        completed = args.sessions - sum(not e.startswith("warm-up") for e in stats.errors)
+        print(f"sessions={args.sessions} processes={args.processes} interleave={args.interleave} "
+              f"chat_turns={args.chat_turns} fake_delay={args.fake_delay}s")
+        print(f"completed {completed}, failed {len(stats.errors)}, {completed / elapsed:.2f} sessions/s "
+              f"(wall time, {args.processes} processes in parallel)")
+        for err in stats.errors[:5]:
+            print(f"  error: {err}")
+        print_latencies(stats)
+        print("RSS per worker at end (MB): " + ", ".join(f"{r / mb:.1f}" for r in rss))
+    else:
+        os.environ.setdefault("PAWPAL_DATA_DIR", tempfile.mkdtemp(prefix="pawpal_load_"))
+        warm = Stats()
+        run_wave(0, args.warmup, args.interleave, args.chat_turns, warm)
+        if warm.errors:
+            raise SystemExit(f"warm-up failed: {warm.errors[0]}")
+
+        stats = Stats()
+        gc.collect()
+        rss_start = rss_bytes()
+        rss_samples = [rss_start]
+        elapsed = 0.0
+        per_wave = max(args.sessions // args.waves, 1)
+        done = 0
+        while done < args.sessions:
+            count = min(per_wave, args.sessions - done)
+            elapsed += run_wave(args.warmup + done, count, args.interleave, args.chat_turns, stats)
+            done += count
+            gc.collect()
+            rss_samples.append(rss_bytes())
+        server.shutdown()
+
+        completed = done - len(stats.errors)
+        print(f"sessions={done} interleaved={args.interleave} chat_turns={args.chat_turns} fake_delay={args.fake_delay}s")
+        print(f"completed {completed}, failed {len(stats.errors)}, {completed / elapsed:.2f} sessions/s "
+              f"(one process, reruns never overlap)")
+        for err in stats.errors[:5]:
+            print(f"  error: {err}")
+        print_latencies(stats)
+        print("RSS after each wave (MB): " + ", ".join(f"{r / mb:.1f}" for r in rss_samples))
+        print(f"RSS growth per session: {(rss_samples[-1] - rss_start) / max(done, 1) / 1024:.1f} KB")
+
+    if stats.state_bytes:
+        print(f"session_state at end of session: mean {statistics.mean(stats.state_bytes) / 1024:.1f} KB, "
+              f"max {max(stats.state_bytes) / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Durable meal log for PawPal: an append-only, checksummed write-ahead log with
+group commit, replay on startup and compaction into a snapshot.
+
+Record format (one per line):
+    <crc32 as 8 hex chars>\t<json payload>\n
+The payload is {"seq": int, "owner": str, "op": "add" | "clear", "entries": [...]}.
+
+Appends from every session are handed to one flusher thread. It writes as soon
+as it is idle; records that arrive while an fsync is in flight are written and
+fsynced together in the next batch (group commit). Callers block until their
+record is on disk, so under load a click costs one shared fsync instead of one
+each, and a lone writer never waits for a batch to fill.
+
+Only one MealLog may write a log directory. Within a process, open_log()
+returns the instance already open for a directory (so a re-created Streamlit
+cache_resource reuses it). Across processes, MealLog holds an exclusive lock on
+meals.lock while open and refuses a directory another process holds (on
+platforms without fcntl, e.g. Windows, this is not enforced).
+"""
+import json
+import os
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+WAL_NAME = "meals.wal"
+SNAPSHOT_NAME = "meals.snapshot.json"
+LOCK_NAME = "meals.lock"
+
+# realpath of the directory -> the MealLog open on it in this process
+_open_logs: dict[str, "MealLog"] = {}
+_open_logs_lock = threading.RLock()
+
+
+def _encode_record(payload: dict) -> bytes:
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return b"%08x\t%s\n" % (zlib.crc32(body), body)
+
+
+def _decode_record(line: bytes) -> dict | None:
+    """Return the payload, or None if the line is torn or fails its checksum."""
+    if not line.endswith(b"\n") or len(line) < 10 or line[8:9] != b"\t":
+        return None
+    body = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(body):
+            return None
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _fsync_dir(path: str) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # not supported on this platform (e.g. Windows)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def open_log(directory: str, **kwargs) -> "MealLog":
+    """Return the MealLog open on `directory` in this process, opening one if there is none."""
+    with _open_logs_lock:
+        log = _open_logs.get(os.path.realpath(directory))
+        return log if log is not None else MealLog(directory, **kwargs)
+
+
+class MealLog:
+    """
+    Process-wide store of food logs per owner, backed by a WAL + snapshot.
+
+    commit_window: extra seconds the flusher waits for more records before
+        writing a batch; 0 relies on batching while an fsync is in flight.
+    compact_bytes: WAL size that triggers compaction into the snapshot.
+    """
+
+    def __init__(self, directory: str, commit_window: float = 0.0, compact_bytes: int = 1 << 20):
+        self.directory = directory
+        self.commit_window = commit_window
+        self.compact_bytes = compact_bytes
+        self.wal_path = os.path.join(directory, WAL_NAME)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+
+        self._logs: dict[str, list[dict]] = {}
+        self._seq = 0           # last sequence number handed out
+        self._durable_seq = 0   # last sequence number known to be on disk
+        self._pending: list[dict] = []
+        self._failed: dict[int, OSError] = {}   # seq -> error, for waiters of a failed batch
+        self._broken: OSError | None = None     # set if the WAL could not be restored after a failure
+        self._compact_requested = False
+        self._compactions = 0
+        self._compact_errors: dict[int, OSError] = {}
+        self._closed = False
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self.batches_written = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._key = os.path.realpath(directory)
+        with _open_logs_lock:
+            if self._key in _open_logs:
+                raise RuntimeError(f"Meal log in {directory!r} is already open in this process; use open_log()")
+            self._lock_fd = self._acquire_dir_lock()
+            try:
+                self._replay()
+                self._wal = open(self.wal_path, "ab", buffering=0)  # unbuffered: a failed write leaves nothing queued
+            except BaseException:
+                os.close(self._lock_fd)
+                raise
+            _open_logs[self._key] = self
+        self._flusher = threading.Thread(target=self._flush_loop, name="meal-log-flusher", daemon=True)
+        self._flusher.start()
+
+    # --- public API ---
+
+    def append(self, owner: str, entries: list[dict]) -> None:
+        """Durably record new log entries for `owner`; returns once fsynced."""
+        self._commit({"owner": owner, "op": "add", "entries": entries})
+
+    def clear(self, owner: str) -> None:
+        """Durably drop every log entry for `owner`."""
+        self._commit({"owner": owner, "op": "clear"})
+
+    def logs_for(self, owner: str) -> list[dict]:
+        with self._lock:
+            return [dict(e) for e in self._logs.get(owner, [])]
+
+    def compact(self) -> None:
+        """Write all state to the snapshot and start a fresh WAL."""
+        with self._lock:
+            target = self._compactions + 1
+            self._compact_requested = True
+            self._cond.notify_all()
+            while self._compactions < target:
+                self._cond.wait()
+            error = self._compact_errors.pop(target, None)
+            if error is not None:
+                raise OSError(f"Meal log compaction failed: {error}") from error
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        self._wal.close()
+        with _open_logs_lock:
+            if _open_logs.get(self._key) is self:
+                del _open_logs[self._key]
+            os.close(self._lock_fd)
+
+    # --- internals ---
+
+    def _acquire_dir_lock(self) -> int:
+        fd = os.open(os.path.join(self.directory, LOCK_NAME), os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is None:
+            return fd
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            raise RuntimeError(f"Meal log in {self.directory!r} is already open in another process") from None
+        return fd
+
+    def _apply(self, payload: dict) -> None:
+        owner = payload["owner"]
+        if payload["op"] == "clear":
+            self._logs.pop(owner, None)
+        else:
+            self._logs.setdefault(owner, []).extend(payload["entries"])
+
+    def _replay(self) -> None:
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snap = json.load(f)
+            snapshot_seq = snap["seq"]
+            self._logs = snap["logs"]
+        self._seq = snapshot_seq
+
+        if not os.path.exists(self.wal_path):
+            return
+        valid_bytes = 0
+        with open(self.wal_path, "rb") as f:
+            for line in f:
+                payload = _decode_record(line)
+                if payload is None:
+                    break  # torn tail from a crash mid-write; drop it and everything after
+                valid_bytes += len(line)
+                if payload["seq"] <= snapshot_seq:
+                    continue  # already folded into the snapshot
+                self._apply(payload)
+                self._seq = payload["seq"]
+        if valid_bytes < os.path.getsize(self.wal_path):
+            with open(self.wal_path, "r+b") as f:
+                f.truncate(valid_bytes)
+                f.flush()
+                os.fsync(f.fileno())
+        self._durable_seq = self._seq
+
+    def _commit(self, payload: dict) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MealLog is closed")
+            if self._broken is not None:
+                raise OSError(f"Meal log is unavailable after a failed write: {self._broken}") from self._broken
+            self._seq += 1
+            self._pending.append({"seq": self._seq, **payload})
+            self._cond.notify_all()
+            self._wait_durable(self._seq)
+
+    def _wait_durable(self, seq: int) -> None:
+        while True:
+            # checked first: a later batch may already have moved _durable_seq past seq
+            error = self._failed.pop(seq, None)
+            if error is not None:
+                raise OSError(f"Meal log write failed: {error}") from error
+            if self._durable_seq >= seq:
+                return
+            self._cond.wait()
+
+    def _flush_loop(self) -> None:
+        with self._lock:
+            while True:
+                while not self._pending and not self._compact_requested and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    if self._compact_requested:
+                        self._run_compaction()
+                        continue
+                    return  # closed with nothing left to write
+                # Appends that arrived during the last fsync are already pending;
+                # an optional window lets a few more join before writing.
+                deadline = time.monotonic() + self.commit_window
+                while not self._closed and (remaining := deadline - time.monotonic()) > 0:
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, []
+                self._lock.release()
+                try:
+                    error = self._write_batch(batch)
+                finally:
+                    self._lock.acquire()
+                self.batches_written += 1
+                if error is not None:
+                    for p in batch:
+                        self._failed[p["seq"]] = error
+                else:
+                    # in-memory state only ever reflects records that are on disk
+                    for p in batch:
+                        self._apply(p)
+                    self._durable_seq = batch[-1]["seq"]
+                    if self._compact_requested or os.fstat(self._wal.fileno()).st_size >= self.compact_bytes:
+                        self._run_compaction()
+                self._cond.notify_all()
+
+    def _write_batch(self, batch: list[dict]) -> OSError | None:
+        """
+        Write and fsync one batch (flusher thread, lock released). On failure
+        the WAL is cut back to where the batch started, so a record whose
+        caller saw an error is never replayed; if even that fails, the log
+        refuses further writes.
+        """
+        if self._broken is not None:
+            return self._broken
+        fd = self._wal.fileno()
+        good_offset = os.fstat(fd).st_size
+        try:
+            _write_all(fd, b"".join(_encode_record(p) for p in batch))
+            os.fsync(fd)
+            return None
+        except OSError as e:
+            try:
+                os.ftruncate(fd, good_offset)
+                os.fsync(fd)
+            except OSError as trunc_error:
+                self._broken = trunc_error
+            return e
+
+    def _run_compaction(self) -> None:
+        """Called by the flusher with the lock held and no write in flight."""
+        self._compactions += 1
+        try:
+            self._compact_locked()
+        except OSError as e:
+            # The WAL still holds every record, so nothing is lost; only an
+            # explicit compact() call reports the failure.
+            if self._compact_requested:
+                self._compact_errors[self._compactions] = e
+        self._compact_requested = False
+        self._cond.notify_all()
+
+    def _compact_locked(self) -> None:
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"seq": self._durable_seq, "logs": self._logs}, f, separators=(",", ":"), ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        _fsync_dir(self.directory)
+        # Records up to the snapshot seq are skipped on replay, so a crash
+        # between the rename and the truncate below loses nothing.
+        os.ftruncate(self._wal.fileno(), 0)
+        os.fsync(self._wal.fileno())
@@ -0,0 +1,615 @@
+"""
+Local food database and free-text meal parsing for PawPal.
+
+Kept free of Streamlit so it can be imported by the app, by offline tools
+(see screening.py) and by worker processes.
+"""
+import re, difflib, functools, math
+
+import numpy as np
+
+# --- LOCAL DATABASE ---
+# Format: "Food Name": {"calories": int, "protein": g, "fat": g, "carbs": g, "unit": str, "is_toxic": bool, "warning": str}
+# Calories and macros are per unit. Toxic items omit macros (counted as 0).
+FOOD_DATABASE = {
+    # Proteins (Cooked/Plain)
+    "Boiled Chicken Breast": {"calories": 165, "protein": 31, "fat": 3.6, "carbs": 0, "unit": "cup", "is_toxic": False},
+    "Lean Ground Beef (Cooked)": {"calories": 332, "protein": 36, "fat": 20, "carbs": 0, "unit": "cup", "is_toxic": False},
+    "Turkey (Cooked, no skin)": {"calories": 238, "protein": 41, "fat": 7, "carbs": 0, "unit": "cup", "is_toxic": False},
+    "Salmon (Cooked)": {"calories": 233, "protein": 25, "fat": 14, "carbs": 0, "unit": "fillet (3oz)", "is_toxic": False},
+    "Tuna (Canned in water)": {"calories": 100, "protein": 22, "fat": 1, "carbs": 0, "unit": "can (3oz)", "is_toxic": False},
+    "Pork Loin (Cooked)": {"calories": 180, "protein": 26, "fat": 8, "carbs": 0, "unit": "chop (3oz)", "is_toxic": False},
+    "Hard Boiled Egg": {"calories": 70, "protein": 6.3, "fat": 4.8, "carbs": 0.6, "unit": "large egg", "is_toxic": False},
+    "Scrambled Egg (Plain)": {"calories": 90, "protein": 6.5, "fat": 6.7, "carbs": 1, "unit": "large egg", "is_toxic": False},
+    "Chicken Thigh (Cooked, no skin)": {"calories": 210, "protein": 26, "fat": 11, "carbs": 0, "unit": "cup", "is_toxic": False},
+    "Turkey Mince (Cooked, lean)": {"calories": 220, "protein": 30, "fat": 10, "carbs": 0, "unit": "cup", "is_toxic": False},
+    "White Fish (Cooked, plain)": {"calories": 140, "protein": 30, "fat": 1.5, "carbs": 0, "unit": "fillet (3oz)", "is_toxic": False},
+    "Plain Tofu (Firm, cooked)": {"calories": 180, "protein": 20, "fat": 11, "carbs": 4, "unit": "cup", "is_toxic": False},
+
+
+    # Grains & Carbs
+    "White Rice (Cooked)": {"calories": 200, "protein": 4.2, "fat": 0.4, "carbs": 44.5, "unit": "cup", "is_toxic": False},
+    "Brown Rice (Cooked)": {"calories": 216, "protein": 5, "fat": 1.8, "carbs": 45, "unit": "cup", "is_toxic": False},
+    "Oatmeal (Plain, Cooked)": {"calories": 150, "protein": 5.5, "fat": 3, "carbs": 27, "unit": "cup", "is_toxic": False},
+    "Sweet Potato (Boiled/Baked)": {"calories": 114, "protein": 2, "fat": 0.2, "carbs": 27, "unit": "cup", "is_toxic": False},
+    "Potato (Boiled, no skin)": {"calories": 130, "protein": 3, "fat": 0.2, "carbs": 30, "unit": "medium potato", "is_toxic": False},
+    "Pasta (Plain, Cooked)": {"calories": 200, "protein": 7, "fat": 1.2, "carbs": 40, "unit": "cup", "is_toxic": False},
+    "Bread (White/Wheat)": {"calories": 70, "protein": 2.5, "fat": 1, "carbs": 13, "unit": "slice", "is_toxic": False},
+    "Quinoa (Cooked)": {"calories": 222, "protein": 8, "fat": 3.6, "carbs": 39, "unit": "cup", "is_toxic": False},
+    "Barley (Cooked)": {"calories": 193, "protein": 3.5, "fat": 0.7, "carbs": 44, "unit": "cup", "is_toxic": False},
+    "Whole Wheat Pasta (Cooked)": {"calories": 174, "protein": 7.5, "fat": 0.8, "carbs": 37, "unit": "cup", "is_toxic": False},
+
+    # Fruits
+    "Apple (no seeds/core)": {"calories": 10, "protein": 0.1, "fat": 0, "carbs": 2.6, "unit": "slice", "is_toxic": False},
+    "Banana": {"calories": 105, "protein": 1.3, "fat": 0.4, "carbs": 27, "unit": "medium banana", "is_toxic": False},
+    "Blueberries": {"calories": 85, "protein": 1.1, "fat": 0.5, "carbs": 21, "unit": "cup", "is_toxic": False},
+    "Strawberries": {"calories": 4, "protein": 0.1, "fat": 0, "carbs": 0.9, "unit": "medium berry", "is_toxic": False},
+    "Watermelon (seedless)": {"calories": 45, "protein": 0.9, "fat": 0.2, "carbs": 11.5, "unit": "cup", "is_toxic": False},
+    "Cantaloupe": {"calories": 50, "protein": 1.3, "fat": 0.3, "carbs": 12, "unit": "cup", "is_toxic": False},
+    "Mango (no pit)": {"calories": 99, "protein": 1.4, "fat": 0.6, "carbs": 25, "unit": "cup", "is_toxic": False},
+    "Pineapple (fresh)": {"calories": 80, "protein": 0.9, "fat": 0.2, "carbs": 21, "unit": "cup", "is_toxic": False},
+    "Pear (no seeds/core)": {"calories": 96, "protein": 0.6, "fat": 0.2, "carbs": 26, "unit": "medium pear", "is_toxic": False},
+    "Raspberries": {"calories": 64, "protein": 1.5, "fat": 0.8, "carbs": 15, "unit": "cup", "is_toxic": False},
+    "Blackberries": {"calories": 62, "protein": 2, "fat": 0.7, "carbs": 14, "unit": "cup", "is_toxic": False},
+    "Peach (no pit)": {"calories": 60, "protein": 1.4, "fat": 0.4, "carbs": 14, "unit": "medium peach", "is_toxic": False},
+
+    # Vegetables
+    "Carrot (Raw)": {"calories": 25, "protein": 0.6, "fat": 0.1, "carbs": 6, "unit": "medium carrot", "is_toxic": False},
+    "Green Beans (Plain)": {"calories": 30, "protein": 1.8, "fat": 0.1, "carbs": 7, "unit": "cup", "is_toxic": False},
+    "Broccoli (Steamed)": {"calories": 55, "protein": 3.7, "fat": 0.6, "carbs": 11, "unit": "cup", "is_toxic": False},
+    "Cucumber": {"calories": 15, "protein": 0.7, "fat": 0.1, "carbs": 3.6, "unit": "cup", "is_toxic": False},
+    "Zucchini": {"calories": 20, "protein": 1.5, "fat": 0.4, "carbs": 3.9, "unit": "cup", "is_toxic": False},
+    "Spinach (Cooked)": {"calories": 40, "protein": 5.3, "fat": 0.5, "carbs": 6.8, "unit": "cup", "is_toxic": False},
+    "Peas (Green)": {"calories": 117, "protein": 7.9, "fat": 0.6, "carbs": 21, "unit": "cup", "is_toxic": False},
+    "Pumpkin (Pure canned)": {"calories": 50, "protein": 1.8, "fat": 0.4, "carbs": 12, "unit": "cup", "is_toxic": False},
+    "Bell Pepper (Red/Yellow)": {"calories": 45, "protein": 1.5, "fat": 0.4, "carbs": 9, "unit": "cup", "is_toxic": False},
+    "Celery": {"calories": 10, "protein": 0.3, "fat": 0.1, "carbs": 1.2, "unit": "stalk", "is_toxic": False},
+    "Lettuce (Romaine/Iceberg)": {"calories": 8, "protein": 0.6, "fat": 0.1, "carbs": 1.5, "unit": "cup", "is_toxic": False},
+
+    # Dairy & Others
+    "Cheddar Cheese": {"calories": 110, "protein": 7, "fat": 9, "carbs": 0.4, "unit": "slice", "is_toxic": False},
+    "Yogurt (Plain Greek)": {"calories": 120, "protein": 20, "fat": 0.9, "carbs": 8, "unit": "cup", "is_toxic": False},
+    "Peanut Butter (Xylitol-free)": {"calories": 95, "protein": 3.6, "fat": 8, "carbs": 3.5, "unit": "tbsp", "is_toxic": False},
+    "Salmon Oil": {"calories": 40, "protein": 0, "fat": 4.5, "carbs": 0, "unit": "tsp", "is_toxic": False},
+    "Coconut Oil": {"calories": 120, "protein": 0, "fat": 13.6, "carbs": 0, "unit": "tbsp", "is_toxic": False},
+    "Cottage Cheese (Low-Fat)": {"calories": 80, "protein": 14, "fat": 1.2, "carbs": 3, "unit": "1/2 cup", "is_toxic": False},
+    "Mozzarella Cheese (Part-skim)": {"calories": 85, "protein": 7, "fat": 6, "carbs": 1, "unit": "1 oz", "is_toxic": False},
+    "Bone Broth (No onion/garlic)": {"calories": 15, "protein": 3, "fat": 0.2, "carbs": 0.5, "unit": "1/2 cup", "is_toxic": False},
+
+    # Commercial Food (Generic)
+    "Dry Kibble (Standard)": {"calories": 350, "protein": 25, "fat": 14, "carbs": 33, "unit": "cup", "is_toxic": False},
+    "Dry Kibble (High Protein)": {"calories": 450, "protein": 38, "fat": 20, "carbs": 28, "unit": "cup", "is_toxic": False},
+    "Dry Kibble (Weight Mgmt)": {"calories": 250, "protein": 22, "fat": 7, "carbs": 27, "unit": "cup", "is_toxic": False},
+    "Wet Canned Food (Standard)": {"calories": 95, "protein": 7, "fat": 6, "carbs": 3.5, "unit": "3 oz can", "is_toxic": False},
+    "Dog Biscuit (Small)": {"calories": 20, "protein": 0.8, "fat": 0.5, "carbs": 3, "unit": "biscuit", "is_toxic": False},
+    "Dog Biscuit (Large)": {"calories": 90, "protein": 3.5, "fat": 2.5, "carbs": 13, "unit": "biscuit", "is_toxic": False},
+    "Dental Stick (Medium)": {"calories": 50, "protein": 1.5, "fat": 0.8, "carbs": 9, "unit": "stick", "is_toxic": False},
+    "Bully Stick (6 inch)": {"calories": 88, "protein": 18, "fat": 1.5, "carbs": 0, "unit": "stick", "is_toxic": False},
+    "Freeze-Dried Raw Bites": {"calories": 55, "protein": 6, "fat": 3.5, "carbs": 0.5, "unit": "1/4 cup", "is_toxic": False},
+    "Training Treat (Small)": {"calories": 3, "protein": 0.2, "fat": 0.1, "carbs": 0.4, "unit": "treat", "is_toxic": False},
+
+    # Toxic / Dangerous
+    "Chocolate (Milk)": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Contains Theobromine. Highly toxic."},
+    "Chocolate (Dark/Baking)": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "EXTREMELY TOXIC even in small amounts."},
+    "Grapes/Raisins": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Can cause rapid kidney failure."},
+    "Onion": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Causes anemia (red blood cell damage)."},
+    "Garlic": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "More potent than onion. Toxic to blood cells."},
+    "Xylitol (Gum/Candy)": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Causes liver failure and hypoglycemia."},
+    "Macadamia Nuts": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Causes weakness, tremors, and paralysis."},
+    "Avocado (Skin/Pit)": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Contains persin. Can cause vomiting/diarrhea."},
+    "Alcohol": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Causes intoxication, coma, and death."},
+    "Coffee/Caffeine": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Causes heart palpitations and seizures."},
+    "Yeast Dough": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Expands in stomach; alcohol poisoning risk."},
+    "Cooked Bones": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Splinter hazard. Can puncture gut."},
+}
+
+# --- CATEGORY MAP FOR DROPDOWN FILTERING ---
+FOOD_CATEGORY_MAP = {
+    "Proteins (Cooked/Plain)": [
+        "Boiled Chicken Breast",
+        "Lean Ground Beef (Cooked)",
+        "Turkey (Cooked, no skin)",
+        "Salmon (Cooked)",
+        "Tuna (Canned in water)",
+        "Pork Loin (Cooked)",
+        "Hard Boiled Egg",
+        "Scrambled Egg (Plain)",
+        "Chicken Thigh (Cooked, no skin)",
+        "Turkey Mince (Cooked, lean)",
+        "White Fish (Cooked, plain)",
+        "Plain Tofu (Firm, cooked)",
+    ],
+    "Grains & Carbs": [
+        "White Rice (Cooked)",
+        "Brown Rice (Cooked)",
+        "Oatmeal (Plain, Cooked)",
+        "Sweet Potato (Boiled/Baked)",
+        "Potato (Boiled, no skin)",
+        "Pasta (Plain, Cooked)",
+        "Bread (White/Wheat)",
+        "Quinoa (Cooked)",
+        "Barley (Cooked)",
+        "Whole Wheat Pasta (Cooked)",
+    ],
+    "Fruits": [
+        "Apple (no seeds/core)",
+        "Banana",
+        "Blueberries",
+        "Strawberries",
+        "Watermelon (seedless)",
+        "Cantaloupe",
+        "Mango (no pit)",
+        "Pineapple (fresh)",
+        "Pear (no seeds/core)",
+        "Raspberries",
+        "Blackberries",
+        "Peach (no pit)",
+    ],
+    "Vegetables": [
+        "Carrot (Raw)",
+        "Green Beans (Plain)",
+        "Broccoli (Steamed)",
+        "Cucumber",
+        "Zucchini",
+        "Spinach (Cooked)",
+        "Peas (Green)",
+        "Pumpkin (Pure canned)",
+        "Bell Pepper (Red/Yellow)",
+        "Celery",
+        "Lettuce (Romaine/Iceberg)",
+    ],
+    "Dairy & Others": [
+        "Cheddar Cheese",
+        "Yogurt (Plain Greek)",
+        "Peanut Butter (Xylitol-free)",
+        "Salmon Oil",
+        "Coconut Oil",
+        "Cottage Cheese (Low-Fat)",
+        "Mozzarella Cheese (Part-skim)",
+        "Bone Broth (No onion/garlic)",
+    ],
+    "Commercial Food (Generic)": [
+        "Dry Kibble (Standard)",
+        "Dry Kibble (High Protein)",
+        "Dry Kibble (Weight Mgmt)",
+        "Wet Canned Food (Standard)",
+        "Dog Biscuit (Small)",
+        "Dog Biscuit (Large)",
+        "Dental Stick (Medium)",
+        "Bully Stick (6 inch)",
+        "Freeze-Dried Raw Bites",
+        "Training Treat (Small)",
+    ],
+}
+
+
+# Simple dangerous keyword detection (for user-typed foods NOT in DB)
+DANGEROUS_KEYWORDS = {
+    "chocolate": "Chocolate (milk, dark, baking) is toxic to dogs.",
+    "cocoa": "Cocoa/chocolate products are toxic to dogs.",
+    "grape": "Grapes and raisins can cause kidney failure in dogs.",
+    "grapes": "Grapes and raisins can cause kidney failure in dogs.",
+    "raisin": "Grapes and raisins can cause kidney failure in dogs.",
+    "raisins": "Grapes and raisins can cause kidney failure in dogs.",
+    "onion": "Onions can damage red blood cells and cause anemia.",
+    "garlic": "Garlic is more potent than onion and is toxic to dogs.",
+    "xylitol": "Xylitol (sweetener) can cause hypoglycemia and liver failure.",
+    "macadamia": "Macadamia nuts can cause weakness and tremors.",
+    "avocado": "Avocado (especially skin/pit) can cause vomiting/diarrhea.",
+    "alcohol": "Alcohol can cause intoxication, coma, and death in dogs.",
+    "beer": "Alcohol (beer, wine, spirits) is dangerous for dogs.",
+    "wine": "Alcohol (beer, wine, spirits) is dangerous for dogs.",
+    "coffee": "Coffee/caffeine can cause heart problems and seizures.",
+    "caffeine": "Caffeine can cause heart problems and seizures.",
+    "espresso": "Caffeine can cause heart problems and seizures.",
+    "yeast dough": "Yeast dough can expand and cause bloat and alcohol poisoning.",
+    "cooked bones": "Cooked bones can splinter and puncture the gut.",
+    "chicken bones": "Cooked bones can splinter and puncture the gut.",
+}
+
+# Common names owners type -> DB key. Phrases are normalized like any input
+# (lowercase, singular, cooking adjectives dropped) before lookup.
+FOOD_ALIASES = {
+    # Proteins
+    "chicken": "Boiled Chicken Breast",
+    "chicken breast": "Boiled Chicken Breast",
+    "beef": "Lean Ground Beef (Cooked)",
+    "hamburger": "Lean Ground Beef (Cooked)",
+    "mince": "Lean Ground Beef (Cooked)",
+    "turkey breast": "Turkey (Cooked, no skin)",
+    "ground turkey": "Turkey Mince (Cooked, lean)",
+    "fish": "White Fish (Cooked, plain)",
+    "cod": "White Fish (Cooked, plain)",
+    "egg": "Hard Boiled Egg",
+    "hard boiled egg": "Hard Boiled Egg",
+    "tofu": "Plain Tofu (Firm, cooked)",
+    "pork": "Pork Loin (Cooked)",
+    # Grains & Carbs
+    "rice": "White Rice (Cooked)",
+    "oat": "Oatmeal (Plain, Cooked)",
+    "porridge": "Oatmeal (Plain, Cooked)",
+    "yam": "Sweet Potato (Boiled/Baked)",
+    "noodle": "Pasta (Plain, Cooked)",
+    "toast": "Bread (White/Wheat)",
+    # Fruits & Vegetables
+    "melon": "Watermelon (seedless)",
+    "berry": "Blueberries",
+    "green bean": "Green Beans (Plain)",
+    "pepper": "Bell Pepper (Red/Yellow)",
+    "lettuce": "Lettuce (Romaine/Iceberg)",
+    # Dairy & Others
+    "cheese": "Cheddar Cheese",
+    "yoghurt": "Yogurt (Plain Greek)",
+    "greek yogurt": "Yogurt (Plain Greek)",
+    "greek yoghurt": "Yogurt (Plain Greek)",
+    "pb": "Peanut Butter (Xylitol-free)",
+    "fish oil": "Salmon Oil",
+    "broth": "Bone Broth (No onion/garlic)",
+    # Commercial Food
+    "kibble": "Dry Kibble (Standard)",
+    "dry food": "Dry Kibble (Standard)",
+    "dog food": "Dry Kibble (Standard)",
+    "diet kibble": "Dry Kibble (Weight Mgmt)",
+    "weight management kibble": "Dry Kibble (Weight Mgmt)",
+    "wet food": "Wet Canned Food (Standard)",
+    "canned dog food": "Wet Canned Food (Standard)",
+    "biscuit": "Dog Biscuit (Small)",
+    "milk bone": "Dog Biscuit (Small)",
+    "dental chew": "Dental Stick (Medium)",
+    "treat": "Training Treat (Small)",
+    "freeze dried": "Freeze-Dried Raw Bites",
+    # Toxic / Dangerous
+    "chocolate": "Chocolate (Milk)",
+    "dark chocolate": "Chocolate (Dark/Baking)",
+    "baking chocolate": "Chocolate (Dark/Baking)",
+    "cocoa": "Chocolate (Dark/Baking)",
+    "grape": "Grapes/Raisins",
+    "raisin": "Grapes/Raisins",
+    "sultana": "Grapes/Raisins",
+    "gum": "Xylitol (Gum/Candy)",
+    "avocado": "Avocado (Skin/Pit)",
+    "beer": "Alcohol",
+    "wine": "Alcohol",
+    "coffee": "Coffee/Caffeine",
+    "espresso": "Coffee/Caffeine",
+    "dough": "Yeast Dough",
+    "bone": "Cooked Bones",
+    "chicken bone": "Cooked Bones",
+}
+
+# Dropped from names and input before matching: they describe preparation,
+# not the food ("boiled chicken" and "Chicken (Cooked)" are the same item).
+_COOKING_WORDS = {
+    "cooked", "boiled", "baked", "steamed", "raw", "plain", "fresh", "grilled",
+    "roasted", "poached", "fried", "lean", "canned", "pure", "chopped", "diced",
+    "sliced", "mashed", "shredded", "unsalted", "homemade",
+}
+_FILLER_WORDS = {"of", "and", "with", "the", "a", "an", "in", "some", "bit", "piece", "slice", "serving"}
+
+# --- NUTRIENT MATRIX ---
+# Row i holds the per-unit NUTRIENTS of FOOD_NAMES[i], so a vector of
+# quantities (in DB units) times the matrix gives nutrient totals.
+NUTRIENTS = ("calories", "protein", "fat", "carbs")
+KCAL_PER_GRAM = {"protein": 4, "fat": 9, "carbs": 4}
+# Daily macro goals as a share of the calorie goal (adult maintenance,
+# with protein kept high for weight-management dogs).
+MACRO_GOAL_SPLIT = {"protein": 0.30, "fat": 0.25, "carbs": 0.45}
+FOOD_NAMES = tuple(FOOD_DATABASE)
+FOOD_INDEX = {name: i for i, name in enumerate(FOOD_NAMES)}
+NUTRIENT_MATRIX = np.array(
+    [[float(FOOD_DATABASE[name].get(n, 0.0)) for n in NUTRIENTS] for name in FOOD_NAMES]
+)
+NUTRIENT_MATRIX.setflags(write=False)
+
+def quantity_vector(food_idx: np.ndarray, qty: np.ndarray) -> np.ndarray:
+    """
+    Dense per-food quantity vector from sparse (food index, quantity) pairs.
+    Repeated foods are summed; index -1 (not in the catalog) is skipped.
+    """
+    food_idx = np.asarray(food_idx, dtype=np.intp)
+    qty = np.asarray(qty, dtype=float)
+    known = food_idx >= 0
+    return np.bincount(food_idx[known], weights=qty[known], minlength=len(FOOD_NAMES))
+
+def nutrient_totals(food_idx: np.ndarray, qty: np.ndarray) -> np.ndarray:
+    """Totals aligned with NUTRIENTS: one matrix-vector product over the catalog."""
+    return quantity_vector(food_idx, qty) @ NUTRIENT_MATRIX
+
+def _logged_quantity(log: dict) -> float:
+    """Amount in DB units: qty_db, or for logs written before it existed, the number the quantity string starts with."""
+    if log.get("qty_db") is not None:
+        return float(log["qty_db"])
+    m = re.match(r"\s*(\d+(\.\d+)?|\.\d+)", str(log.get("quantity", "")))
+    return float(m.group(1)) if m else 0.0
+
+def log_nutrient_totals(logs: list[dict]) -> np.ndarray:
+    """Totals aligned with NUTRIENTS for food log entries; foods not in the catalog count as zero."""
+    food_idx = [FOOD_INDEX.get(log["food"], -1) for log in logs]
+    return nutrient_totals(np.array(food_idx, dtype=np.intp), np.array([_logged_quantity(log) for log in logs]))
+
+def macro_goals(daily_kcal: float) -> np.ndarray:
+    """Gram goals for protein, fat and carbs (NUTRIENTS[1:]) given a calorie goal."""
+    macros = NUTRIENTS[1:]
+    split = np.array([MACRO_GOAL_SPLIT[m] for m in macros])
+    kcal_per_g = np.array([KCAL_PER_GRAM[m] for m in macros])
+    return daily_kcal * split / kcal_per_g
+
+_QTY_UNITS = (
+    "kg", "g", "gram", "grams", "cup", "cups", "tbsp", "tablespoon", "tsp", "teaspoon", "oz", "ounce", "ounces",
+    "piece", "pieces", "slice", "slices", "egg", "eggs", "can", "cans", "biscuit", "biscuits", "stick", "sticks",
+    "banana", "bananas", "potato", "potatoes", "carrot", "carrots",
+)
+_QTY_RE = re.compile(
+    r"""(?P<num>\d+\s+\d+/\d+|\d+/\d+|\d+(\.\d+)?|\.\d+)\s*  # mixed numbers and fractions before plain numbers
+        (?P<unit>""" + "|".join(_QTY_UNITS) + r""")?\b  # \b: "carrots" is one unit, not "carrot" + "s"
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+def detect_dangerous_keywords(text: str) -> list[str]:
+    text_l = text.lower()
+    hits = []
+    for key, msg in DANGEROUS_KEYWORDS.items():
+        if key in text_l:
+            hits.append(msg)
+    return list(dict.fromkeys(hits))  # dedupe while preserving order
+
+def _parse_mixed_number(s: str) -> float:
+    s = s.strip()
+    if " " in s and "/" in s:
+        a, b = s.split(" ", 1)
+        n, d = b.split("/", 1)
+        return float(a) + float(n) / float(d)
+    if "/" in s:
+        n, d = s.split("/", 1)
+        return float(n) / float(d)
+    return float(s)
+
+def _canonicalize_unit(u: str | None) -> str | None:
+    if not u:
+        return None
+    u = u.lower()
+    # normalize some common words to more generic units
+    mapping = {
+        "gram": "g", "grams": "g",
+        "ounce": "oz", "ounces": "oz",
+        "tablespoon": "tbsp", "teaspoon": "tsp",
+        "cup": "cup", "cups": "cup",
+        "piece": "piece", "pieces": "piece",
+        "slice": "slice", "slices": "slice",
+        "egg": "egg", "eggs": "egg",
+        "can": "can", "cans": "can",
+        "biscuit": "biscuit", "biscuits": "biscuit",
+        "stick": "stick", "sticks": "stick",
+        "banana": "banana", "bananas": "banana",
+        "potato": "potato", "potatoes": "potato",
+        "carrot": "carrot", "carrots": "carrot",
+    }
+    return mapping.get(u, u)
+
+def _singular(tok: str) -> str:
+    if len(tok) <= 3 or tok.endswith("ss"):
+        return tok
+    if tok.endswith("ies"):
+        return tok[:-3] + "y"       # berries -> berry
+    if tok.endswith(("oes", "ches", "shes", "xes")):
+        return tok[:-2]             # potatoes -> potato, peaches -> peach
+    if tok.endswith("s"):
+        return tok[:-1]
+    return tok
+
+def _normalize_tokens(text: str) -> list[str]:
+    """Lowercase word tokens, singularized, with cooking adjectives and filler removed."""
+    toks = (_singular(t) for t in re.findall(r"[a-z0-9]+", text.lower()))
+    return [t for t in toks if t not in _COOKING_WORDS and t not in _FILLER_WORDS]
+
+def _name_tokens(food_name: str) -> tuple[list[str], list[str]]:
+    """
+    Split a DB key into (core tokens, qualifier tokens from parentheticals).
+    Exclusions inside parentheticals ("no onion/garlic", "Xylitol-free") are
+    dropped so they never match the thing they exclude.
+    """
+    qualifiers = " ".join(re.findall(r"\(([^)]*)\)", food_name))
+    qualifiers = re.sub(r"\bno\s+[\w/ ]+|\w+-free", " ", qualifiers, flags=re.IGNORECASE)
+    core = re.sub(r"\([^)]*\)", " ", food_name)
+    core_toks = _normalize_tokens(core)
+    return core_toks, [t for t in _normalize_tokens(qualifiers) if t not in core_toks]
+
+@functools.lru_cache(maxsize=8)
+def _food_index(food_names: tuple[str, ...]) -> dict:
+    """
+    Inverted index over food names: token -> {food: weight}. Core tokens weigh
+    1.0, parenthetical qualifiers 0.5, each scaled by inverse document
+    frequency so rare words ("thigh", "salmon") outweigh common ones ("rice").
+    """
+    postings: dict[str, dict[str, float]] = {}
+    for fn in food_names:
+        core, qualifiers = _name_tokens(fn)
+        for tok in qualifiers:
+            postings.setdefault(tok, {})[fn] = 0.5
+        for tok in core:
+            postings.setdefault(tok, {})[fn] = 1.0
+    n = len(food_names)
+    idf = {tok: math.log(1 + n / len(foods)) for tok, foods in postings.items()}
+    index = {tok: {fn: w * idf[tok] for fn, w in foods.items()} for tok, foods in postings.items()}
+    norms: dict[str, float] = {}
+    for foods in index.values():
+        for fn, w in foods.items():
+            norms[fn] = norms.get(fn, 0.0) + w
+    aliases = {
+        " ".join(_normalize_tokens(alias)): target
+        for alias, target in FOOD_ALIASES.items() if target in food_names
+    }
+    # Portion words ("stalk", "fillet", "slice") that name no food are ignored
+    # in input, so "2 celery stalks" is just celery.
+    unit_text = " ".join(_QTY_UNITS + tuple(FOOD_DATABASE[fn]["unit"] for fn in food_names if fn in FOOD_DATABASE))
+    unit_words = {_singular(t) for t in re.findall(r"[a-z]+", unit_text.lower())} - index.keys()
+    return {
+        "index": index,
+        "norms": norms,
+        "unknown_weight": math.log(1 + n),  # an unseen input token counts as maximally rare
+        "unit_words": unit_words,
+        "aliases": aliases,
+        "lower": {fn.lower(): fn for fn in food_names},
+        "order": {fn: i for i, fn in enumerate(food_names)},
+    }
+
+def warm_caches() -> None:
+    """Build the lazily created matching index now (at app start) instead of on the first typed meal."""
+    _food_index(FOOD_NAMES)
+
+# A ranked hit is only accepted at or above this score; otherwise "hot dog"
+# would log a dog biscuit and "chicken rice" a cup of rice.
+MIN_MATCH_SCORE = 0.6
+
+def _rank_food_matches(name: str, food_names: list[str]) -> list[tuple[float, str]]:
+    """
+    Score every food containing the head noun of `name` (its last token:
+    "whole wheat bread" is bread, not whole wheat pasta), best first. The
+    score is a normalized weighted overlap (1.0 = same tokens); input words
+    no food uses ("organic") lower it. Ties go to the food listed first in
+    the database, so ambiguous input always resolves the same way. Returns []
+    if the head noun is unknown: "apple pie" and "beef jerky" name foods
+    that are not in the database.
+    """
+    idx = _food_index(tuple(food_names))
+    toks = [t for t in dict.fromkeys(_normalize_tokens(name)) if t not in idx["unit_words"]]
+    if not toks or toks[-1] not in idx["index"]:
+        return []
+    candidates = idx["index"][toks[-1]]
+    query_norm = 0.0
+    overlap: dict[str, float] = {}
+    for tok in toks:
+        foods = idx["index"].get(tok)
+        if not foods:
+            query_norm += idx["unknown_weight"]
+            continue
+        query_norm += max(foods.values())
+        for fn, w in foods.items():
+            if fn in candidates:
+                overlap[fn] = overlap.get(fn, 0.0) + w
+    ranked = [
+        (ov / math.sqrt(query_norm * idx["norms"][fn]), fn)
+        for fn, ov in overlap.items()
+    ]
+    ranked.sort(key=lambda r: (-r[0], idx["order"][r[1]]))
+    return ranked
+
+def _best_food_match(name: str, food_names: list[str]) -> str | None:
+    nm = name.strip().lower()
+    if not nm:
+        return None
+    idx = _food_index(tuple(food_names))
+    # exact lower match
+    if nm in idx["lower"]:
+        return idx["lower"][nm]
+    # curated alias on the normalized phrase ("PB", "cooked rice", "eggs")
+    alias = idx["aliases"].get(" ".join(_normalize_tokens(nm)))
+    if alias:
+        return alias
+    # best scored token overlap, if confident enough
+    ranked = _rank_food_matches(nm, food_names)
+    if ranked and ranked[0][0] >= MIN_MATCH_SCORE:
+        return ranked[0][1]
+    # fuzzy match (typos)
+    candidates = difflib.get_close_matches(name, food_names, n=1, cutoff=0.6)
+    return candidates[0] if candidates else None
+
+def _parse_item_fragment(fragment: str) -> tuple[float, str | None, str]:
+    s = fragment.strip()
+    m = _QTY_RE.search(s)
+    if not m:
+        return 1.0, None, s  # default to 1 unit
+    num_str = m.group("num")
+    unit = _canonicalize_unit(m.group("unit"))
+    qty = _parse_mixed_number(num_str)
+
+    name_guess = (s[:m.start()] + s[m.end():]).strip()
+    name_guess = re.sub(r"\b(of|and|with|the|a)\b", " ", name_guess, flags=re.IGNORECASE)
+    name_guess = re.sub(r"\s+", " ", name_guess).strip()
+    return qty, unit, name_guess
+
+def _convert_quantity_if_needed(qty: float, typed_unit: str | None, db_unit: str) -> tuple[float, list[str]]:
+    notes = []
+    tu = typed_unit or db_unit
+    # If identical or very similar, just use qty as DB units
+    if tu == db_unit or tu in db_unit.lower() or db_unit.lower() in tu:
+        return qty, notes
+
+    # Sample generic conversions (extend as needed)
+    if db_unit == "g" and tu in {"kg", "oz"}:
+        if tu == "kg":
+            return qty * 1000.0, notes
+        if tu == "oz":
+            return qty * 28.3495, notes
+    if db_unit == "cup" and tu in {"tbsp", "tsp"}:
+        if tu == "tbsp":
+            return qty / 16.0, notes
+        if tu == "tsp":
+            return qty / 48.0, notes
+
+    # For slice/piece/egg/biscuit/stick, just treat them as a count
+    if db_unit in {"slice", "biscuit", "stick", "large egg", "medium banana", "medium potato", "medium carrot", "medium peach", "medium pear"}:
+        return qty, notes
+
+    notes.append(f"Couldn’t reliably convert from '{tu}' to '{db_unit}'. Using quantity as {qty} {db_unit}(s).")
+    return qty, notes
+
+def estimate_from_text(input_text: str, FOOD_DATABASE: dict) -> dict:
+    """
+    Parse free text like:
+        '1 cup boiled chicken breast + 1 tbsp peanut butter, 120 g white rice'
+    and return items + total kcal + nutrient totals (NUTRIENTS, for foods in the built-in catalog).
+    """
+    results = {
+        "items": [],
+        "total_kcal": 0.0,
+        "toxicity": [],
+        "messages": [],
+        "unmatched": [],
+        "nutrients": dict.fromkeys(NUTRIENTS, 0.0),
+    }
+
+    fragments = [p for p in re.split(r"[+,]", input_text) if p.strip()]
+    food_names = list(FOOD_DATABASE.keys())
+
+    for frag in fragments:
+        qty_typed, unit_typed, name_guess = _parse_item_fragment(frag)
+        # "3 carrots", "2 eggs": the unit word is the food itself
+        matched = _best_food_match(name_guess or (unit_typed or ""), food_names)
+        if not matched:
+            results["unmatched"].append(name_guess or frag.strip())
+            continue
+
+        details = FOOD_DATABASE[matched]
+        db_unit = details["unit"]
+        per_unit_kcal = float(details["calories"])
+        is_toxic = bool(details.get("is_toxic", False))
+        if is_toxic:
+            warn = details.get("warning", f"{matched} is marked as toxic to dogs.")
+            results["toxicity"].append(f"⚠️ {warn}")
+
+        tu = unit_typed or db_unit
+        adj_qty, notes = _convert_quantity_if_needed(qty_typed, tu, db_unit)
+        results["messages"].extend(notes)
+
+        kcal = per_unit_kcal * adj_qty
+        results["total_kcal"] += kcal
+
+        results["items"].append({
+            "name_input": frag.strip(),
+            "qty_typed": qty_typed,
+            "unit_typed": tu,
+            "name_matched": matched,
+            "qty_db_units": adj_qty,
+            "unit_db": db_unit,
+            "kcal_each": kcal,
+        })
+
+    if results["items"]:
+        totals = nutrient_totals(
+            [FOOD_INDEX.get(it["name_matched"], -1) for it in results["items"]],
+            [it["qty_db_units"] for it in results["items"]],
+        )
+        results["nutrients"] = dict(zip(NUTRIENTS, totals.tolist()))
+    return results
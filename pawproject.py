@@ -1,11 +1,30 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import json
+import math
 import plotly.graph_objects as go
-import re, difflib, datetime
+import requests
+import datetime
 import os
+import time
+import uuid
+from collections import deque
+
+import screening
+import session_snapshot
+from meal_log import MealLog, open_log
+from nutrition import (
+    FOOD_DATABASE, FOOD_CATEGORY_MAP, NUTRIENTS,
+    detect_dangerous_keywords, estimate_from_text, log_nutrient_totals, macro_goals, warm_caches,
+)
+
+_RUN_CPU_START = time.process_time()
+_RUN_WALL_START = time.perf_counter()
 
 OPENROUTER_API_KEY = st.secrets.get("OPENROUTER_API_KEY", "")
+# Override to point the vet assistant at another OpenAI-compatible endpoint (e.g. a local fake for load tests)
+OPENROUTER_BASE_URL = os.environ.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 
 
 
@@ -43,370 +62,99 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-# --- LOCAL DATABASE ---
-# Format: "Food Name": {"calories": int, "unit": str, "is_toxic": bool, "warning": str}
-FOOD_DATABASE = {
-    # Proteins (Cooked/Plain)
-    "Boiled Chicken Breast": {"calories": 165, "unit": "cup", "is_toxic": False},
-    "Lean Ground Beef (Cooked)": {"calories": 332, "unit": "cup", "is_toxic": False},
-    "Turkey (Cooked, no skin)": {"calories": 238, "unit": "cup", "is_toxic": False},
-    "Salmon (Cooked)": {"calories": 233, "unit": "fillet (3oz)", "is_toxic": False},
-    "Tuna (Canned in water)": {"calories": 100, "unit": "can (3oz)", "is_toxic": False},
-    "Pork Loin (Cooked)": {"calories": 180, "unit": "chop (3oz)", "is_toxic": False},
-    "Hard Boiled Egg": {"calories": 70, "unit": "large egg", "is_toxic": False},
-    "Scrambled Egg (Plain)": {"calories": 90, "unit": "large egg", "is_toxic": False},
-    "Chicken Thigh (Cooked, no skin)": {"calories": 210, "unit": "cup", "is_toxic": False},
-    "Turkey Mince (Cooked, lean)": {"calories": 220, "unit": "cup", "is_toxic": False},
-    "White Fish (Cooked, plain)": {"calories": 140, "unit": "fillet (3oz)", "is_toxic": False},
-    "Plain Tofu (Firm, cooked)": {"calories": 180, "unit": "cup", "is_toxic": False},
-
-
-    # Grains & Carbs
-    "White Rice (Cooked)": {"calories": 200, "unit": "cup", "is_toxic": False},
-    "Brown Rice (Cooked)": {"calories": 216, "unit": "cup", "is_toxic": False},
-    "Oatmeal (Plain, Cooked)": {"calories": 150, "unit": "cup", "is_toxic": False},
-    "Sweet Potato (Boiled/Baked)": {"calories": 114, "unit": "cup", "is_toxic": False},
-    "Potato (Boiled, no skin)": {"calories": 130, "unit": "medium potato", "is_toxic": False},
-    "Pasta (Plain, Cooked)": {"calories": 200, "unit": "cup", "is_toxic": False},
-    "Bread (White/Wheat)": {"calories": 70, "unit": "slice", "is_toxic": False},
-    "Quinoa (Cooked)": {"calories": 222, "unit": "cup", "is_toxic": False},
-    "Barley (Cooked)": {"calories": 193, "unit": "cup", "is_toxic": False},
-    "Whole Wheat Pasta (Cooked)": {"calories": 174, "unit": "cup", "is_toxic": False},
-
-    # Fruits
-    "Apple (no seeds/core)": {"calories": 10, "unit": "slice", "is_toxic": False},
-    "Banana": {"calories": 105, "unit": "medium banana", "is_toxic": False},
-    "Blueberries": {"calories": 85, "unit": "cup", "is_toxic": False},
-    "Strawberries": {"calories": 4, "unit": "medium berry", "is_toxic": False},
-    "Watermelon (seedless)": {"calories": 45, "unit": "cup", "is_toxic": False},
-    "Cantaloupe": {"calories": 50, "unit": "cup", "is_toxic": False},
-    "Mango (no pit)": {"calories": 99, "unit": "cup", "is_toxic": False},
-    "Pineapple (fresh)": {"calories": 80, "unit": "cup", "is_toxic": False},
-    "Pear (no seeds/core)": {"calories": 96, "unit": "medium pear", "is_toxic": False},
-    "Raspberries": {"calories": 64, "unit": "cup", "is_toxic": False},
-    "Blackberries": {"calories": 62, "unit": "cup", "is_toxic": False},
-    "Peach (no pit)": {"calories": 60, "unit": "medium peach", "is_toxic": False},
-
-    # Vegetables
-    "Carrot (Raw)": {"calories": 25, "unit": "medium carrot", "is_toxic": False},
-    "Green Beans (Plain)": {"calories": 30, "unit": "cup", "is_toxic": False},
-    "Broccoli (Steamed)": {"calories": 55, "unit": "cup", "is_toxic": False},
-    "Cucumber": {"calories": 15, "unit": "cup", "is_toxic": False},
-    "Zucchini": {"calories": 20, "unit": "cup", "is_toxic": False},
-    "Spinach (Cooked)": {"calories": 40, "unit": "cup", "is_toxic": False},
-    "Peas (Green)": {"calories": 117, "unit": "cup", "is_toxic": False},
-    "Pumpkin (Pure canned)": {"calories": 50, "unit": "cup", "is_toxic": False},
-    "Bell Pepper (Red/Yellow)": {"calories": 45, "unit": "cup", "is_toxic": False},
-    "Celery": {"calories": 10, "unit": "stalk", "is_toxic": False},
-    "Lettuce (Romaine/Iceberg)": {"calories": 8, "unit": "cup", "is_toxic": False},
-
-    # Dairy & Others
-    "Cheddar Cheese": {"calories": 110, "unit": "slice", "is_toxic": False},
-    "Yogurt (Plain Greek)": {"calories": 120, "unit": "cup", "is_toxic": False},
-    "Peanut Butter (Xylitol-free)": {"calories": 95, "unit": "tbsp", "is_toxic": False},
-    "Salmon Oil": {"calories": 40, "unit": "tsp", "is_toxic": False},
-    "Coconut Oil": {"calories": 120, "unit": "tbsp", "is_toxic": False},
-    "Cottage Cheese (Low-Fat)": {"calories": 80, "unit": "1/2 cup", "is_toxic": False},
-    "Mozzarella Cheese (Part-skim)": {"calories": 85, "unit": "1 oz", "is_toxic": False},
-    "Bone Broth (No onion/garlic)": {"calories": 15, "unit": "1/2 cup", "is_toxic": False},
-
-    # Commercial Food (Generic)
-    "Dry Kibble (Standard)": {"calories": 350, "unit": "cup", "is_toxic": False},
-    "Dry Kibble (High Protein)": {"calories": 450, "unit": "cup", "is_toxic": False},
-    "Dry Kibble (Weight Mgmt)": {"calories": 250, "unit": "cup", "is_toxic": False},
-    "Wet Canned Food (Standard)": {"calories": 95, "unit": "3 oz can", "is_toxic": False},
-    "Dog Biscuit (Small)": {"calories": 20, "unit": "biscuit", "is_toxic": False},
-    "Dog Biscuit (Large)": {"calories": 90, "unit": "biscuit", "is_toxic": False},
-    "Dental Stick (Medium)": {"calories": 50, "unit": "stick", "is_toxic": False},
-    "Bully Stick (6 inch)": {"calories": 88, "unit": "stick", "is_toxic": False},
-    "Freeze-Dried Raw Bites": {"calories": 55, "unit": "1/4 cup", "is_toxic": False},
-    "Training Treat (Small)": {"calories": 3, "unit": "treat", "is_toxic": False},
-
-    # Toxic / Dangerous
-    "Chocolate (Milk)": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Contains Theobromine. Highly toxic."},
-    "Chocolate (Dark/Baking)": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "EXTREMELY TOXIC even in small amounts."},
-    "Grapes/Raisins": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Can cause rapid kidney failure."},
-    "Onion": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Causes anemia (red blood cell damage)."},
-    "Garlic": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "More potent than onion. Toxic to blood cells."},
-    "Xylitol (Gum/Candy)": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Causes liver failure and hypoglycemia."},
-    "Macadamia Nuts": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Causes weakness, tremors, and paralysis."},
-    "Avocado (Skin/Pit)": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Contains persin. Can cause vomiting/diarrhea."},
-    "Alcohol": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Causes intoxication, coma, and death."},
-    "Coffee/Caffeine": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Causes heart palpitations and seizures."},
-    "Yeast Dough": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Expands in stomach; alcohol poisoning risk."},
-    "Cooked Bones": {"calories": 0, "unit": "any amount", "is_toxic": True, "warning": "Splinter hazard. Can puncture gut."},
+# --- PERSISTENCE ---
+DATA_DIR = os.environ.get("PAWPAL_DATA_DIR", "pawpal_data")
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "sessions")
+SNAPSHOT_CHAT_LIMIT = 50  # most recent chat messages kept in a snapshot
+SNAPSHOT_MAX_AGE_DAYS = 90  # snapshots not saved or restored for this long are deleted
+DEFAULT_DOG_PROFILE = {
+    "name": "Duoduo",
+    "weight_kg": 25.0,
+    "dog_breed": "Golden Retriver",
+    "activity_key": "Neutered/Spayed (Normal)",
+    "activity_level": 1.6 # Default active
 }
 
-# --- CATEGORY MAP FOR DROPDOWN FILTERING ---
-FOOD_CATEGORY_MAP = {
-    "Proteins (Cooked/Plain)": [
-        "Boiled Chicken Breast",
-        "Lean Ground Beef (Cooked)",
-        "Turkey (Cooked, no skin)",
-        "Salmon (Cooked)",
-        "Tuna (Canned in water)",
-        "Pork Loin (Cooked)",
-        "Hard Boiled Egg",
-        "Scrambled Egg (Plain)",
-        "Chicken Thigh (Cooked, no skin)",
-        "Turkey Mince (Cooked, lean)",
-        "White Fish (Cooked, plain)",
-        "Plain Tofu (Firm, cooked)",
-    ],
-    "Grains & Carbs": [
-        "White Rice (Cooked)",
-        "Brown Rice (Cooked)",
-        "Oatmeal (Plain, Cooked)",
-        "Sweet Potato (Boiled/Baked)",
-        "Potato (Boiled, no skin)",
-        "Pasta (Plain, Cooked)",
-        "Bread (White/Wheat)",
-        "Quinoa (Cooked)",
-        "Barley (Cooked)",
-        "Whole Wheat Pasta (Cooked)",
-    ],
-    "Fruits": [
-        "Apple (no seeds/core)",
-        "Banana",
-        "Blueberries",
-        "Strawberries",
-        "Watermelon (seedless)",
-        "Cantaloupe",
-        "Mango (no pit)",
-        "Pineapple (fresh)",
-        "Pear (no seeds/core)",
-        "Raspberries",
-        "Blackberries",
-        "Peach (no pit)",
-    ],
-    "Vegetables": [
-        "Carrot (Raw)",
-        "Green Beans (Plain)",
-        "Broccoli (Steamed)",
-        "Cucumber",
-        "Zucchini",
-        "Spinach (Cooked)",
-        "Peas (Green)",
-        "Pumpkin (Pure canned)",
-        "Bell Pepper (Red/Yellow)",
-        "Celery",
-        "Lettuce (Romaine/Iceberg)",
-    ],
-    "Dairy & Others": [
-        "Cheddar Cheese",
-        "Yogurt (Plain Greek)",
-        "Peanut Butter (Xylitol-free)",
-        "Salmon Oil",
-        "Coconut Oil",
-        "Cottage Cheese (Low-Fat)",
-        "Mozzarella Cheese (Part-skim)",
-        "Bone Broth (No onion/garlic)",
-    ],
-    "Commercial Food (Generic)": [
-        "Dry Kibble (Standard)",
-        "Dry Kibble (High Protein)",
-        "Dry Kibble (Weight Mgmt)",
-        "Wet Canned Food (Standard)",
-        "Dog Biscuit (Small)",
-        "Dog Biscuit (Large)",
-        "Dental Stick (Medium)",
-        "Bully Stick (6 inch)",
-        "Freeze-Dried Raw Bites",
-        "Training Treat (Small)",
-    ],
-}
+@st.cache_resource
+def get_meal_log() -> MealLog:
+    """
+    One write-ahead meal log per server process, shared by every session.
+    open_log hands back the already-open log if this cache entry is rebuilt
+    (cache cleared or this function edited).
+    """
+    return open_log(DATA_DIR)
 
 
-# Simple dangerous keyword detection (for user-typed foods NOT in DB)
-DANGEROUS_KEYWORDS = {
-    "chocolate": "Chocolate (milk, dark, baking) is toxic to dogs.",
-    "cocoa": "Cocoa/chocolate products are toxic to dogs.",
-    "grape": "Grapes and raisins can cause kidney failure in dogs.",
-    "grapes": "Grapes and raisins can cause kidney failure in dogs.",
-    "raisin": "Grapes and raisins can cause kidney failure in dogs.",
-    "raisins": "Grapes and raisins can cause kidney failure in dogs.",
-    "onion": "Onions can damage red blood cells and cause anemia.",
-    "garlic": "Garlic is more potent than onion and is toxic to dogs.",
-    "xylitol": "Xylitol (sweetener) can cause hypoglycemia and liver failure.",
-    "macadamia": "Macadamia nuts can cause weakness and tremors.",
-    "avocado": "Avocado (especially skin/pit) can cause vomiting/diarrhea.",
-    "alcohol": "Alcohol can cause intoxication, coma, and death in dogs.",
-    "beer": "Alcohol (beer, wine, spirits) is dangerous for dogs.",
-    "wine": "Alcohol (beer, wine, spirits) is dangerous for dogs.",
-    "coffee": "Coffee/caffeine can cause heart problems and seizures.",
-    "caffeine": "Caffeine can cause heart problems and seizures.",
-    "espresso": "Caffeine can cause heart problems and seizures.",
-    "yeast dough": "Yeast dough can expand and cause bloat and alcohol poisoning.",
-    "cooked bones": "Cooked bones can splinter and puncture the gut.",
-    "chicken bones": "Cooked bones can splinter and puncture the gut.",
-}
+@st.cache_data(ttl=3600, show_spinner=False)
+def prune_old_snapshots() -> int:
+    """Delete expired session snapshots; cached with a TTL so it runs at most hourly per process."""
+    return session_snapshot.prune_snapshots(SNAPSHOT_DIR, SNAPSHOT_MAX_AGE_DAYS * 86400)
 
-_QTY_RE = re.compile(
-    r"""(?P<num>\d+(\.\d+)?|\d+/\d+|\d+\s+\d+/\d+|\.\d+)\s*
-        (?P<unit>kg|g|gram|grams|cup|cups|tbsp|tablespoon|tsp|teaspoon|oz|ounce|ounces|piece|pieces|slice|slices|egg|eggs|can|cans|biscuit|biscuits|stick|sticks|banana|bananas|potato|potatoes|carrot|carrots)?""",
-    re.IGNORECASE | re.VERBOSE,
-)
 
-def detect_dangerous_keywords(text: str) -> list[str]:
-    text_l = text.lower()
-    hits = []
-    for key, msg in DANGEROUS_KEYWORDS.items():
-        if key in text_l:
-            hits.append(msg)
-    return list(dict.fromkeys(hits))  # dedupe while preserving order
-
-def _parse_mixed_number(s: str) -> float:
-    s = s.strip()
-    if " " in s and "/" in s:
-        a, b = s.split(" ", 1)
-        n, d = b.split("/", 1)
-        return float(a) + float(n) / float(d)
-    if "/" in s:
-        n, d = s.split("/", 1)
-        return float(n) / float(d)
-    return float(s)
-
-def _canonicalize_unit(u: str | None) -> str | None:
-    if not u:
-        return None
-    u = u.lower()
-    # normalize some common words to more generic units
-    mapping = {
-        "gram": "g", "grams": "g",
-        "ounce": "oz", "ounces": "oz",
-        "tablespoon": "tbsp", "teaspoon": "tsp",
-        "cup": "cup", "cups": "cup",
-        "piece": "piece", "pieces": "piece",
-        "slice": "slice", "slices": "slice",
-        "egg": "egg", "eggs": "egg",
-        "can": "can", "cans": "can",
-        "biscuit": "biscuit", "biscuits": "biscuit",
-        "stick": "stick", "sticks": "stick",
-        "banana": "banana", "bananas": "banana",
-        "potato": "potato", "potatoes": "potato",
-        "carrot": "carrot", "carrots": "carrot",
-    }
-    return mapping.get(u, u)
-
-def _best_food_match(name: str, food_names: list[str]) -> str | None:
-    nm = name.strip().lower()
-    if not nm:
-        return None
-    # exact lower match
-    lower_map = {fn.lower(): fn for fn in food_names}
-    if nm in lower_map:
-        return lower_map[nm]
-    # contains/contained
-    for fn in food_names:
-        if nm in fn.lower() or fn.lower() in nm:
-            return fn
-    # fuzzy match
-    candidates = difflib.get_close_matches(name, food_names, n=1, cutoff=0.6)
-    return candidates[0] if candidates else None
-
-def _parse_item_fragment(fragment: str) -> tuple[float, str | None, str]:
-    s = fragment.strip()
-    m = _QTY_RE.search(s)
-    if not m:
-        return 1.0, None, s  # default to 1 unit
-    num_str = m.group("num")
-    unit = _canonicalize_unit(m.group("unit"))
-    qty = _parse_mixed_number(num_str)
-
-    name_guess = (s[:m.start()] + s[m.end():]).strip()
-    name_guess = re.sub(r"\b(of|and|with|the|a)\b", " ", name_guess, flags=re.IGNORECASE)
-    name_guess = re.sub(r"\s+", " ", name_guess).strip()
-    return qty, unit, name_guess
-
-def _convert_quantity_if_needed(qty: float, typed_unit: str | None, db_unit: str) -> tuple[float, list[str]]:
-    notes = []
-    tu = typed_unit or db_unit
-    # If identical or very similar, just use qty as DB units
-    if tu == db_unit or tu in db_unit.lower() or db_unit.lower() in tu:
-        return qty, notes
-
-    # Sample generic conversions (extend as needed)
-    if db_unit == "g" and tu in {"kg", "oz"}:
-        if tu == "kg":
-            return qty * 1000.0, notes
-        if tu == "oz":
-            return qty * 28.3495, notes
-    if db_unit == "cup" and tu in {"tbsp", "tsp"}:
-        if tu == "tbsp":
-            return qty / 16.0, notes
-        if tu == "tsp":
-            return qty / 48.0, notes
-
-    # For slice/piece/egg/biscuit/stick, just treat them as a count
-    if db_unit in {"slice", "biscuit", "stick", "large egg", "medium banana", "medium potato", "medium carrot", "medium peach", "medium pear"}:
-        return qty, notes
-
-    notes.append(f"Couldn’t reliably convert from '{tu}' to '{db_unit}'. Using quantity as {qty} {db_unit}(s).")
-    return qty, notes
-
-def estimate_from_text(input_text: str, FOOD_DATABASE: dict) -> dict:
+# --- WARM CACHE ---
+@st.cache_resource
+def get_static_ui() -> dict:
     """
-    Parse free text like:
-        '1 cup boiled chicken breast + 1 tbsp peanut butter, 120 g white rice'
-    and return items + total kcal.
+    Structures derived from constants, built once per process and shared by
+    every session (so a new session does not rebuild them).
     """
-    results = {
-        "items": [],
-        "total_kcal": 0.0,
-        "toxicity": [],
-        "messages": [],
-        "unmatched": [],
+    warm_caches()
+    activity_options = {
+        "Neutered/Spayed (Normal)": 1.6,
+        "Intact (Normal)": 1.8,
+        "Inactive/Obese prone": 1.2,
+        "Weight Loss Goal": 1.0,
+        "Highly Active/Working": 2.0,
+        "Puppy (<4 months)": 3.0
+    }
+    return {
+        "activity_options": activity_options,
+        "activity_labels": list(activity_options),
+        "categories": list(FOOD_CATEGORY_MAP),
+        # only foods that actually exist in the DB
+        "category_foods": {
+            cat: [f for f in foods if f in FOOD_DATABASE] for cat, foods in FOOD_CATEGORY_MAP.items()
+        },
     }
 
-    fragments = [p for p in re.split(r"[+,]", input_text) if p.strip()]
-    food_names = list(FOOD_DATABASE.keys())
-
-    for frag in fragments:
-        qty_typed, unit_typed, name_guess = _parse_item_fragment(frag)
-        matched = _best_food_match(name_guess, food_names)
-        if not matched:
-            results["unmatched"].append(name_guess or frag.strip())
-            continue
-
-        details = FOOD_DATABASE[matched]
-        db_unit = details["unit"]
-        per_unit_kcal = float(details["calories"])
-        is_toxic = bool(details.get("is_toxic", False))
-        if is_toxic:
-            warn = details.get("warning", f"{matched} is marked as toxic to dogs.")
-            results["toxicity"].append(f"⚠️ {warn}")
-
-        tu = unit_typed or db_unit
-        adj_qty, notes = _convert_quantity_if_needed(qty_typed, tu, db_unit)
-        results["messages"].extend(notes)
-
-        kcal = per_unit_kcal * adj_qty
-        results["total_kcal"] += kcal
-
-        results["items"].append({
-            "name_input": frag.strip(),
-            "qty_typed": qty_typed,
-            "unit_typed": tu,
-            "name_matched": matched,
-            "qty_db_units": adj_qty,
-            "unit_db": db_unit,
-            "kcal_each": kcal,
-        })
-
-    return results
+
+@st.cache_resource
+def get_first_render_times() -> deque:
+    """Time to first render (ms) of recent sessions in this process."""
+    return deque(maxlen=500)
+
+
+static_ui = get_static_ui()
+prune_old_snapshots()
+
 
 # --- STATE MANAGEMENT ---
+# The owner id is kept in the URL (?owner=...) so a reload or redeploy finds the same
+# logs, and a returning owner gets their profile and chat back from one snapshot read.
+restored = {}
+if 'owner_id' not in st.session_state:
+    owner_id = st.query_params.get("owner", "")
+    if session_snapshot.OWNER_ID_RE.fullmatch(owner_id):
+        restored = session_snapshot.load_snapshot(SNAPSHOT_DIR, owner_id) or {}
+    else:
+        owner_id = uuid.uuid4().hex[:12]
+    st.session_state.owner_id = owner_id
+    st.query_params["owner"] = owner_id
 if 'food_logs' not in st.session_state:
-    st.session_state.food_logs = []
+    st.session_state.food_logs = get_meal_log().logs_for(st.session_state.owner_id)
+if 'logs_version' not in st.session_state:
+    st.session_state.logs_version = 0  # bumped on every change to food_logs
 if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
+    st.session_state.chat_history = restored.get("chat", [])
+if 'render_cpu_ms' not in st.session_state:
+    st.session_state.render_cpu_ms = {}
 if 'dog_profile' not in st.session_state:
-    st.session_state.dog_profile = {
-        "name": "Duoduo",
-        "weight_kg": 25.0,
-        "dog_breed": "Golden Retriver", 
-        "activity_level": 1.6 # Default active
-    }
+    st.session_state.dog_profile = restored.get("profile") or dict(DEFAULT_DOG_PROFILE)
+if '_snapshot_signature' not in st.session_state:
+    # What is already on disk (nothing, for a default session), so unchanged state is never written
+    st.session_state._snapshot_signature = session_snapshot.signature(
+        st.session_state.dog_profile, st.session_state.chat_history
+    )
 
 # --- HELPER FUNCTIONS ---
 
@@ -417,6 +165,100 @@ def calculate_mer(weight, factor):
     return int(rer * factor)
 
 
+def add_food_logs(entries: list[dict]) -> bool:
+    """
+    Durably append log entries (returns once they are in the meal log), then
+    bump logs_version so cached dashboard views rebuild. Returns False, after
+    showing an error, if the meal log could not be written.
+    """
+    try:
+        get_meal_log().append(st.session_state.owner_id, entries)
+    except OSError as e:
+        st.error(f"This meal was NOT logged: could not save it ({e}). Please try again.")
+        return False
+    st.session_state.food_logs.extend(entries)
+    st.session_state.logs_version += 1
+    return True
+
+
+def record_cpu_time(label: str, started: float) -> None:
+    """Store the server CPU time (ms) spent since `started` under `label`."""
+    st.session_state.render_cpu_ms[label] = round((time.process_time() - started) * 1000, 2)
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list (q in (0, 1])."""
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+def save_session_snapshot() -> None:
+    """Write this owner's snapshot if the profile or chat changed since it was restored or last written."""
+    profile = st.session_state.dog_profile
+    chat = st.session_state.chat_history
+    signature = session_snapshot.signature(profile, chat)
+    if st.session_state._snapshot_signature == signature:
+        return
+    session_snapshot.save_snapshot(
+        SNAPSHOT_DIR, st.session_state.owner_id,
+        {"profile": profile, "chat": chat[-SNAPSHOT_CHAT_LIMIT:]},
+    )
+    st.session_state._snapshot_signature = signature
+
+
+# --- CACHED BUILDERS ---
+
+@st.cache_resource(show_spinner=False, max_entries=256)
+def build_intake_gauge(consumed_today: int, daily_goal: int, bar_color: str) -> go.Figure:
+    """
+    Gauge figure for the dashboard, cached on its inputs. cache_resource, not
+    cache_data: a cache_data hit unpickles the figure and re-runs plotly's
+    validation, which costs more than building it. The shared figure is only
+    read (st.plotly_chart serializes a copy), never mutated.
+    """
+    fig = go.Figure(go.Indicator(
+        mode = "gauge+number",
+        value = consumed_today,
+        domain = {'x': [0, 1], 'y': [0, 1]},
+        title = {'text': "Daily Intake"},
+        gauge = {
+            'axis': {'range': [None, daily_goal * 1.2]},
+            'bar': {'color': bar_color},
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': daily_goal
+            }
+        }
+    ))
+    fig.update_layout(height=300)
+    return fig
+
+
+def get_todays_logs(today_str: str) -> tuple[list[dict], int, pd.DataFrame | None, np.ndarray]:
+    """
+    Return (today's logs, kcal consumed today, display table, nutrient totals
+    aligned with NUTRIENTS). Rebuilt only when logs_version or the date
+    changes; otherwise served from session_state.
+    """
+    key = (st.session_state.logs_version, today_str)
+    cached = st.session_state.get("_todays_logs_cache")
+    if cached is not None and cached["key"] == key:
+        return cached["logs"], cached["consumed"], cached["table"], cached["nutrients"]
+
+    todays_logs = [log for log in st.session_state.food_logs if log['date'] == today_str]
+    consumed_today = sum(log['calories'] for log in todays_logs)
+    table = None
+    nutrients = np.zeros(len(NUTRIENTS))
+    if todays_logs:
+        df = pd.DataFrame(todays_logs)
+        table = df[['time', 'food', 'quantity', 'calories']]
+        nutrients = log_nutrient_totals(todays_logs)
+    st.session_state._todays_logs_cache = {
+        "key": key, "logs": todays_logs, "consumed": consumed_today, "table": table, "nutrients": nutrients,
+    }
+    return todays_logs, consumed_today, table, nutrients
+
+
 def get_vet_advice(question: str, dog_profile: dict) -> str:
     """
     Call DeepSeek via OpenRouter using HTTP requests.
@@ -455,7 +297,7 @@ def get_vet_advice(question: str, dog_profile: dict) -> str:
         f"Dog profile: {profile_str}\n"
     )
 
-    url = "https://openrouter.ai/api/v1/chat/completions"
+    url = f"{OPENROUTER_BASE_URL}/chat/completions"
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
@@ -502,24 +344,20 @@ with st.sidebar:
     dog_name = st.text_input("Duoduo", value=st.session_state.dog_profile["name"])
     weight = st.number_input("Weight (kg)", value=st.session_state.dog_profile["weight_kg"], step=0.5)
     
-    activity_options = {
-        "Neutered/Spayed (Normal)": 1.6,
-        "Intact (Normal)": 1.8,
-        "Inactive/Obese prone": 1.2,
-        "Weight Loss Goal": 1.0,
-        "Highly Active/Working": 2.0,
-        "Puppy (<4 months)": 3.0
-    }
+    activity_options = static_ui["activity_options"]
+    activity_labels = static_ui["activity_labels"]
+    saved_activity = st.session_state.dog_profile.get("activity_key")
     
     activity_key = st.selectbox(
         "Life Stage / Activity", 
-        options=list(activity_options.keys()),
-        index=0
+        options=activity_labels,
+        index=activity_labels.index(saved_activity) if saved_activity in activity_options else 0
     )
     
     # Update Session State
     st.session_state.dog_profile["name"] = dog_name
     st.session_state.dog_profile["weight_kg"] = weight
+    st.session_state.dog_profile["activity_key"] = activity_key
     st.session_state.dog_profile["activity_level"] = activity_options[activity_key]
     
     # Calculate Goal
@@ -527,51 +365,47 @@ with st.sidebar:
     st.metric(label="Daily Calorie Goal", value=f"{daily_goal} kcal")
     
     if st.button("Clear Data"):
-        st.session_state.food_logs = []
-        st.session_state.chat_history = []
-        st.rerun()
-
-# --- CALCULATE DAILY GOAL (MER) ---
-weight = st.session_state.dog_profile.get("weight", 0)
-
-if weight > 0:
-    # RER formula
-    rer = 70 * (weight ** 0.75)
-
-    # Activity multiplier
-    activity = st.session_state.dog_profile.get("activity_level", "normal")
-
-    if activity == "low":
-        multiplier = 1.2
-    elif activity == "moderate":
-        multiplier = 1.6
-    elif activity == "high":
-        multiplier = 2.0
-    elif activity == "very_high":
-        multiplier = 3.0
-    else:
-        multiplier = 1.6  # default
-
-    daily_goal = int(rer * multiplier)
-
-else:
-    daily_goal = 0
-
+        try:
+            get_meal_log().clear(st.session_state.owner_id)
+        except OSError as e:
+            st.error(f"Could not clear the food log ({e}). Please try again.")
+        else:
+            st.session_state.food_logs = []
+            st.session_state.logs_version += 1
+            st.session_state.chat_history = []
+            st.rerun()
+
+    with st.expander("⏱️ Render cost (last run)"):
+        if st.session_state.render_cpu_ms:
+            for label, ms in st.session_state.render_cpu_ms.items():
+                st.caption(f"{label}: {ms} ms CPU")
+        else:
+            st.caption("No timings recorded yet.")
+        first_renders = sorted(get_first_render_times())
+        if first_renders:
+            st.caption(
+                f"Time to first render: this session {st.session_state.get('first_render_ms', '-')} ms; "
+                f"p50 {percentile(first_renders, 0.50)} ms, "
+                f"p95 {percentile(first_renders, 0.95)} ms "
+                f"over {len(first_renders)} sessions"
+            )
 
 # --- MAIN PAGE ---
 
 st.title(f"🐶 PawPal: {st.session_state.dog_profile['name']}'s Tracker")
 
-# Tabs for different functions
-tab1, tab2, tab3 = st.tabs(["📊 Daily Dashboard", "🍖 Add Food (Local DB)", "🩺 Ask the Vet"])
+# Each tab body is a fragment: widgets inside a tab rerun only that tab, so a
+# chat message does not rebuild the dashboard and vice versa. Logging food
+# calls st.rerun() for a full-app rerun so the dashboard picks up new logs.
 
 # --- TAB 1: DASHBOARD ---
-with tab1:
-    # Filter logs for today
+@st.fragment
+def render_dashboard(daily_goal: int):
+    started = time.process_time()
+    # Filter logs for today (cached on logs_version + date)
     today_str = datetime.date.today().strftime("%Y-%m-%d")
-    todays_logs = [log for log in st.session_state.food_logs if log['date'] == today_str]
-    
-    consumed_today = sum(log['calories'] for log in todays_logs)
+    todays_logs, consumed_today, todays_table, nutrients = get_todays_logs(today_str)
+
     remaining = daily_goal - consumed_today
     
     # Progress Bar Logic
@@ -591,34 +425,34 @@ with tab1:
     st.progress(progress)
     
     # Visual Chart
-    fig = go.Figure(go.Indicator(
-        mode = "gauge+number",
-        value = consumed_today,
-        domain = {'x': [0, 1], 'y': [0, 1]},
-        title = {'text': "Daily Intake"},
-        gauge = {
-            'axis': {'range': [None, daily_goal * 1.2]},
-            'bar': {'color': bar_color},
-            'threshold': {
-                'line': {'color': "red", 'width': 4},
-                'thickness': 0.75,
-                'value': daily_goal
-            }
-        }
-    ))
-    fig.update_layout(height=300)
+    gauge_started = time.process_time()
+    fig = build_intake_gauge(consumed_today, daily_goal, bar_color)
     st.plotly_chart(fig, use_container_width=True)
+    record_cpu_time("Dashboard gauge", gauge_started)
+
+    # Macros vs goals (grams; NUTRIENTS[1:] = protein, fat, carbs)
+    st.subheader("🥩 Macros")
+    macro_names = NUTRIENTS[1:]
+    eaten = nutrients[1:]
+    goals = macro_goals(daily_goal)
+    ratios = np.divide(eaten, goals, out=np.zeros_like(eaten), where=goals > 0)
+    for col, name, g_eaten, g_goal, ratio in zip(st.columns(len(macro_names)), macro_names, eaten, goals, ratios):
+        col.metric(name.capitalize(), f"{g_eaten:.0f} g")
+        col.caption(f"Goal {g_goal:.0f} g")
+        col.progress(float(min(ratio, 1.0)))
 
     st.subheader("📝 Today's Logs")
     if todays_logs:
-        df = pd.DataFrame(todays_logs)
-        st.dataframe(df[['time', 'food', 'quantity', 'calories']], use_container_width=True)
+        st.dataframe(todays_table, use_container_width=True)
     else:
         st.info("No food logged yet today.")
+    record_cpu_time("Dashboard tab", started)
 
 
 # --- TAB 2: ADD FOOD (CATEGORIES + FREE TEXT) ---
-with tab2:
+@st.fragment
+def render_add_food():
+    started = time.process_time()
     st.header("Log a Meal")
 
     col_left, col_right = st.columns(2)
@@ -630,15 +464,11 @@ with tab2:
 
         big_category = st.selectbox(
             "Food Category",
-            list(FOOD_CATEGORY_MAP.keys()),
+            static_ui["categories"],
             key="category_select_tab2",
         )
 
-        # Filter foods that actually exist in the DB
-        category_foods = [
-            f for f in FOOD_CATEGORY_MAP.get(big_category, [])
-            if f in FOOD_DATABASE
-        ]
+        category_foods = static_ui["category_foods"].get(big_category, [])
         if not category_foods:
             st.warning("No foods found for this category in the database.")
         else:
@@ -659,7 +489,11 @@ with tab2:
                 step=0.25,
                 key="quantity_category_tab2",
             )
-            st.info(f"Basis: {calories_per_unit} kcal per {unit}")
+            st.info(
+                f"Basis: {calories_per_unit} kcal per {unit} · "
+                f"protein {food_details.get('protein', 0)} g · fat {food_details.get('fat', 0)} g · "
+                f"carbs {food_details.get('carbs', 0)} g"
+            )
 
             log_selected = st.button("Log Selected Food", use_container_width=True)
 
@@ -694,11 +528,12 @@ with tab2:
                         "time": datetime.datetime.now().strftime("%H:%M"),
                         "food": selected_food_name,
                         "quantity": f"{quantity} {unit}",
+                        "qty_db": quantity,
                         "calories": total_calories,
                     }
-                    st.session_state.food_logs.append(new_log)
-                    st.success("Meal logged successfully!")
-                    st.rerun()
+                    if add_food_logs([new_log]):
+                        st.success("Meal logged successfully!")
+                        st.rerun()
 
     # ---------- RIGHT: FREE-TEXT ENTRY ----------
     with col_right:
@@ -759,36 +594,52 @@ with tab2:
                                 st.caption(f"ℹ️ {msg}")
 
                         total_calories = int(round(parsed["total_kcal"]))
+                        macros = parsed["nutrients"]
                         st.markdown(
-                            f"<div class='safe-box'>Total Estimated Calories: <b>{total_calories} kcal</b></div>",
+                            f"<div class='safe-box'>Total Estimated Calories: <b>{total_calories} kcal</b><br>"
+                            f"Protein {macros['protein']:.1f} g · Fat {macros['fat']:.1f} g · "
+                            f"Carbs {macros['carbs']:.1f} g</div>",
                             unsafe_allow_html=True,
                         )
 
                         # Log each parsed item into session_state
                         now_date = datetime.date.today().strftime("%Y-%m-%d")
                         now_time = datetime.datetime.now().strftime("%H:%M")
+                        new_logs = []
                         for it in parsed["items"]:
                             qty_str = f"{it['qty_db_units']:.2f} {it['unit_db']}"
-                            new_log = {
+                            new_logs.append({
                                 "date": now_date,
                                 "time": now_time,
                                 "food": it["name_matched"],
                                 "quantity": qty_str,
+                                "qty_db": it["qty_db_units"],
                                 "calories": int(round(it["kcal_each"])),
-                            }
-                            st.session_state.food_logs.append(new_log)
-
-                        st.success("Typed meal logged successfully!")
-                        st.rerun()
+                            })
+                        if add_food_logs(new_logs):
+                            st.success("Typed meal logged successfully!")
+                            st.rerun()
+    record_cpu_time("Add Food tab", started)
 
 
 # --- TAB 3: ASK THE VET / AI ASSISTANT ---
-with tab3:
+# Only the most recent messages are rendered by default; long histories stay
+# in session_state but older turns are drawn only when asked for.
+CHAT_RENDER_WINDOW = 20
+
+
+@st.fragment
+def render_vet_chat():
+    started = time.process_time()
     st.header("🩺 Ask the AI Vet Assistant")
     st.caption("This is not a real veterinarian. For emergencies, contact a vet immediately.")
 
     # show previous chat
-    for msg in st.session_state.chat_history:
+    history = st.session_state.chat_history
+    hidden = max(len(history) - CHAT_RENDER_WINDOW, 0)
+    if hidden and not st.toggle(f"Show {hidden} earlier message(s)", key="show_full_chat"):
+        history = history[hidden:]
+    for msg in history:
         with st.chat_message(msg["role"]):
             st.write(msg["content"])
 
@@ -807,3 +658,73 @@ with tab3:
                 st.write(response)
 
         st.session_state.chat_history.append({"role": "assistant", "content": response})
+        save_session_snapshot()
+    record_cpu_time("Vet chat tab", started)
+
+
+# --- TAB 4: BULK SCREENING ---
+@st.fragment
+def render_bulk_screening():
+    started = time.process_time()
+    st.header("🧪 Bulk Toxicity Screening")
+    st.caption(
+        "Upload past meal logs or house recipes (CSV, JSON Lines, or one item per line). "
+        "Every row is checked for dangerous keywords and toxic database foods."
+    )
+
+    uploaded = st.file_uploader("Meal history or recipes", type=["csv", "jsonl", "ndjson", "txt"], key="screen_upload")
+    if uploaded is not None and st.button("Screen File", use_container_width=True):
+        with st.spinner("Screening..."):
+            result = screening.screen_file(uploaded, screening.detect_kind(uploaded.name))
+        result["report_csv"] = screening.report_to_csv(result["flagged"])
+        # kept across reruns (e.g. the download click) for as long as this upload stays
+        st.session_state.screen_result = (uploaded.file_id, result)
+
+    saved = st.session_state.get("screen_result")
+    if saved is not None and (uploaded is None or saved[0] != uploaded.file_id):
+        del st.session_state.screen_result  # file removed or replaced: its report no longer applies
+        saved = None
+    if saved is not None:
+        result = saved[1]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Rows Screened", result["rows"])
+        col2.metric("Flagged", len(result["flagged"]))
+        col3.metric("Throughput", f"{result['mb_per_s']:.2f} MB/s")
+
+        if result["flagged"]:
+            st.markdown(
+                f"<div class='warning-box'>⚠️ {len(result['flagged'])} row(s) contain potentially toxic foods.</div>",
+                unsafe_allow_html=True,
+            )
+            report_df = pd.DataFrame(result["flagged"])
+            report_df["terms"] = report_df["terms"].str.join("; ")
+            report_df["warnings"] = report_df["warnings"].str.join("; ")
+            st.dataframe(report_df, use_container_width=True, hide_index=True)
+            st.download_button(
+                "Download Report (CSV)",
+                result["report_csv"],
+                file_name="toxicity_report.csv",
+                mime="text/csv",
+                on_click="ignore",  # downloading needs no rerun
+            )
+        else:
+            st.markdown("<div class='safe-box'>✅ No toxic foods found.</div>", unsafe_allow_html=True)
+    record_cpu_time("Bulk screening tab", started)
+
+
+# Tabs for different functions
+tab1, tab2, tab3, tab4 = st.tabs(["📊 Daily Dashboard", "🍖 Add Food (Local DB)", "🩺 Ask the Vet", "🧪 Bulk Screening"])
+with tab1:
+    render_dashboard(daily_goal)
+with tab2:
+    render_add_food()
+with tab3:
+    render_vet_chat()
+with tab4:
+    render_bulk_screening()
+
+save_session_snapshot()
+record_cpu_time("Full run", _RUN_CPU_START)
+if 'first_render_ms' not in st.session_state:
+    st.session_state.first_render_ms = round((time.perf_counter() - _RUN_WALL_START) * 1000, 1)
+    get_first_render_times().append(st.session_state.first_render_ms)
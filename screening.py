@@ -0,0 +1,227 @@
+"""
+Bulk toxicity screening of meal history and house recipes.
+
+Streams rows from a CSV, JSON Lines or plain-text file (one row per line)
+through the same checks the app runs on typed input: detect_dangerous_keywords()
+plus the is_toxic flag of whatever estimate_from_text() matches in
+FOOD_DATABASE. Rows are screened in chunks across worker processes and only
+flagged rows are reported, with the matched terms and warnings.
+
+Usage:
+    python screening.py meals.csv [--out report.csv] [--workers 8]
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterable, Iterator
+
+from nutrition import DANGEROUS_KEYWORDS, FOOD_DATABASE, detect_dangerous_keywords, estimate_from_text
+
+# CSV/JSONL fields screened when present; otherwise every field is screened.
+# A CSV's first row is only taken as a header if it names one of these.
+TEXT_COLUMNS = ("food", "foods", "meal", "recipe", "ingredients", "name", "description", "text")
+CHUNK_ROWS = 2000
+PARALLEL_MIN_BYTES = 1 << 20  # below this, worker start-up costs more than it saves
+REPORT_FIELDS = ["row", "text", "terms", "warnings"]
+
+# Cheap pre-check: rows with no keyword at all skip the per-keyword scan.
+_ANY_KEYWORD_RE = re.compile("|".join(re.escape(k) for k in DANGEROUS_KEYWORDS))
+
+
+@lru_cache(maxsize=65536)
+def _toxic_db_matches(fragment: str) -> tuple[tuple[str, str], ...]:
+    """(DB name, warning) for each toxic item estimate_from_text matches in one fragment."""
+    parsed = estimate_from_text(fragment, FOOD_DATABASE)
+    toxic_items = [it["name_matched"] for it in parsed["items"] if FOOD_DATABASE[it["name_matched"]].get("is_toxic")]
+    return tuple(zip(toxic_items, parsed["toxicity"]))
+
+
+def screen_text(text: str) -> tuple[list[str], list[str]]:
+    """Return (matched terms, warnings) for one row; both are empty for a clean row."""
+    terms, warnings = [], []
+    text_l = text.lower()
+    if _ANY_KEYWORD_RE.search(text_l):
+        terms.extend(k for k in DANGEROUS_KEYWORDS if k in text_l)
+        warnings.extend(detect_dangerous_keywords(text))
+    # estimate_from_text splits on + and , itself; doing it here lets repeated
+    # fragments (common in meal logs) hit the cache.
+    for frag in re.split(r"[+,]", text):
+        frag = frag.strip()
+        if frag:
+            for name, warn in _toxic_db_matches(frag):
+                terms.append(name)
+                warnings.append(warn)
+    return list(dict.fromkeys(terms)), list(dict.fromkeys(warnings))
+
+
+def _screen_chunk(chunk: list[tuple[int, str]]) -> list[dict]:
+    flagged = []
+    for row_no, text in chunk:
+        terms, warnings = screen_text(text)
+        if terms:
+            flagged.append({"row": row_no, "text": text, "terms": terms, "warnings": warnings})
+    return flagged
+
+
+def detect_kind(filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in {".jsonl", ".ndjson"}:
+        return "jsonl"
+    return "text"
+
+
+def _record_text(record: dict) -> str:
+    keys = [k for k in record if str(k).strip().lower() in TEXT_COLUMNS] or list(record)
+    # joined with commas so each field is parsed as its own fragment
+    return ", ".join(str(record[k]) for k in keys if record[k] not in (None, ""))
+
+
+def iter_rows(stream: io.TextIOBase, kind: str) -> Iterator[tuple[int, str]]:
+    """Yield (row number, text to screen) from a text stream; row numbers start at 1."""
+    if kind == "csv":
+        reader = csv.reader(stream)
+        first = next(reader, None)
+        if first is None:
+            return
+        cols = [i for i, h in enumerate(first) if h.strip().lower() in TEXT_COLUMNS]
+        if cols:
+            rows = reader  # first row is a header naming the text columns
+        else:
+            # No known column name: the file has no header (or one we cannot
+            # use), so the first row is screened as data rather than dropped.
+            rows = itertools.chain([first], reader)
+        for row_no, row in enumerate(rows, start=1):
+            fields = (row[i] for i in cols if i < len(row)) if cols else row
+            yield row_no, ", ".join(f for f in fields if f.strip())
+    elif kind == "jsonl":
+        for row_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield row_no, line.strip()  # screen malformed lines as plain text
+                continue
+            yield row_no, _record_text(record) if isinstance(record, dict) else str(record)
+    else:
+        for row_no, line in enumerate(stream, start=1):
+            if line.strip():
+                yield row_no, line.strip()
+
+
+def _chunks(rows: Iterable[tuple[int, str]], size: int) -> Iterator[list[tuple[int, str]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def screen_rows(rows: Iterable[tuple[int, str]], workers: int = 1, chunk_rows: int = CHUNK_ROWS) -> Iterator[dict]:
+    """
+    Yield flagged rows in input order. With workers > 1, chunks are screened
+    in a process pool with a bounded number in flight, so memory stays flat
+    however large the input is.
+    """
+    chunks = _chunks(rows, chunk_rows)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from _screen_chunk(chunk)
+        return
+    # spawn: the Streamlit server is multi-threaded, which makes fork unsafe
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(_screen_chunk, chunk))
+            if len(in_flight) >= 2 * workers:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def screen_file(raw: io.BufferedIOBase, kind: str, workers: int | None = None) -> dict:
+    """
+    Screen a binary file object (an open file or a Streamlit upload).
+    workers=None uses every core for inputs over PARALLEL_MIN_BYTES, else 1.
+
+    Returns {"flagged": [...], "rows": int, "bytes": int, "seconds": float, "mb_per_s": float}.
+    """
+    start_pos = raw.tell()
+    if workers is None:
+        size = raw.seek(0, io.SEEK_END) - start_pos
+        raw.seek(start_pos)
+        workers = (os.cpu_count() or 1) if size >= PARALLEL_MIN_BYTES else 1
+
+    counted = {"rows": 0}
+
+    def counting(rows):
+        for row in rows:
+            counted["rows"] += 1
+            yield row
+
+    started = time.perf_counter()
+    stream = io.TextIOWrapper(raw, encoding="utf-8", errors="replace", newline="")
+    try:
+        flagged = list(screen_rows(counting(iter_rows(stream, kind)), workers=workers))
+        n_bytes = raw.tell() - start_pos
+    finally:
+        stream.detach()  # leave the caller's file object open
+    seconds = time.perf_counter() - started
+    return {
+        "flagged": flagged,
+        "rows": counted["rows"],
+        "bytes": n_bytes,
+        "seconds": seconds,
+        "mb_per_s": n_bytes / 1e6 / seconds if seconds > 0 else 0.0,
+    }
+
+
+def report_to_csv(flagged: list[dict]) -> str:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=REPORT_FIELDS)
+    writer.writeheader()
+    for row in flagged:
+        writer.writerow({**row, "terms": "; ".join(row["terms"]), "warnings": "; ".join(row["warnings"])})
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen meal logs or recipes for foods toxic to dogs.")
+    parser.add_argument("path", help="CSV, JSON Lines (.jsonl) or plain-text file")
+    parser.add_argument("--out", help="write the flagged-row report here (CSV); default stdout")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores for large files)")
+    args = parser.parse_args()
+
+    with open(args.path, "rb") as raw:
+        result = screen_file(raw, detect_kind(args.path), workers=args.workers)
+
+    report = report_to_csv(result["flagged"])
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as f:
+            f.write(report)
+    else:
+        sys.stdout.write(report)
+    print(
+        f"{result['rows']} rows, {len(result['flagged'])} flagged, "
+        f"{result['bytes'] / 1e6:.2f} MB in {result['seconds']:.2f} s ({result['mb_per_s']:.2f} MB/s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Per-owner session snapshots for PawPal's warm start.
+
+A returning owner's dog profile and recent chat are restored from one small
+file (zlib-compressed JSON) instead of starting from defaults. Food logs are
+not included: they already come back from the meal log (see meal_log.py).
+Snapshots not saved or restored for a while are removed by prune_snapshots().
+"""
+import json
+import os
+import re
+import tempfile
+import time
+import zlib
+
+SNAPSHOT_VERSION = 1
+# Owner ids come from the URL, so they are checked before being used in a path.
+OWNER_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def snapshot_path(directory: str, owner: str) -> str:
+    if not OWNER_ID_RE.fullmatch(owner):
+        raise ValueError(f"Invalid owner id: {owner!r}")
+    return os.path.join(directory, f"{owner}.snap")
+
+
+def signature(profile: dict, chat: list[dict]) -> tuple:
+    """Cheap fingerprint of what a snapshot holds, to skip rewriting unchanged state."""
+    return tuple(sorted(profile.items())), len(chat), chat[-1]["content"] if chat else None
+
+
+def load_snapshot(directory: str, owner: str) -> dict | None:
+    """Return the owner's snapshot, or None if there is none or it cannot be read."""
+    path = snapshot_path(directory, owner)
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(zlib.decompress(f.read()))
+    except FileNotFoundError:
+        return None
+    except (zlib.error, ValueError):
+        return None  # corrupt or from an incompatible build: start fresh
+    if not isinstance(data, dict) or data.get("v") != SNAPSHOT_VERSION:
+        return None
+    try:
+        os.utime(path)  # a visit counts as use for prune_snapshots()
+    except OSError:
+        pass
+    return data
+
+
+def save_snapshot(directory: str, owner: str, data: dict) -> None:
+    """Atomically replace the owner's snapshot with `data`."""
+    path = snapshot_path(directory, owner)
+    os.makedirs(directory, exist_ok=True)
+    payload = zlib.compress(json.dumps({"v": SNAPSHOT_VERSION, **data}, separators=(",", ":")).encode("utf-8"))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def prune_snapshots(directory: str, max_age_seconds: float) -> int:
+    """Delete snapshots (and stray temp files) untouched for max_age_seconds; returns how many."""
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if not entry.name.endswith((".snap", ".tmp")):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass  # removed concurrently by another session
+    return removed
@@ -0,0 +1,165 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import meal_log
+from meal_log import MealLog, open_log
+
+ENTRY = {"date": "2024-01-01", "time": "08:00", "food": "Banana", "quantity": "1 medium", "calories": 105}
+
+
+def entry(n: int) -> dict:
+    return {**ENTRY, "calories": n}
+
+
+def test_replay_restores_appends_and_clears(tmp_path):
+    log = MealLog(str(tmp_path))
+    log.append("a", [entry(1), entry(2)])
+    log.append("b", [entry(3)])
+    log.clear("a")
+    log.append("a", [entry(4)])
+    log.close()
+
+    log = MealLog(str(tmp_path))
+    assert log.logs_for("a") == [entry(4)]
+    assert log.logs_for("b") == [entry(3)]
+    log.close()
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    log = MealLog(str(tmp_path))
+    log.append("a", [entry(1)])
+    log.append("a", [entry(2)])
+    log.close()
+    wal_path = os.path.join(tmp_path, meal_log.WAL_NAME)
+    good_size = os.path.getsize(wal_path)
+    with open(wal_path, "ab") as f:
+        f.write(b'0badc0de\t{"seq": 3, "owner": "a", "op": "add", "ent')  # crash mid-write
+
+    log = MealLog(str(tmp_path))
+    assert log.logs_for("a") == [entry(1), entry(2)]
+    assert os.path.getsize(wal_path) == good_size
+    log.append("a", [entry(3)])
+    log.close()
+
+    log = MealLog(str(tmp_path))
+    assert log.logs_for("a") == [entry(1), entry(2), entry(3)]
+    log.close()
+
+
+def test_compaction_folds_wal_into_snapshot(tmp_path):
+    log = MealLog(str(tmp_path))
+    log.append("a", [entry(1)])
+    log.compact()
+    assert os.path.getsize(os.path.join(tmp_path, meal_log.WAL_NAME)) == 0
+    log.append("a", [entry(2)])
+    log.close()
+
+    log = MealLog(str(tmp_path))
+    assert log.logs_for("a") == [entry(1), entry(2)]
+    log.close()
+
+
+def test_size_triggered_compaction(tmp_path):
+    log = MealLog(str(tmp_path), compact_bytes=512)
+    for n in range(20):
+        log.append("a", [entry(n)])
+    log.close()
+    assert os.path.getsize(os.path.join(tmp_path, meal_log.WAL_NAME)) < 512
+
+    log = MealLog(str(tmp_path))
+    assert log.logs_for("a") == [entry(n) for n in range(20)]
+    log.close()
+
+
+def test_failed_fsync_only_fails_its_own_batch(tmp_path, monkeypatch):
+    log = MealLog(str(tmp_path))
+    log.append("a", [entry(1)])
+    real_fsync = os.fsync
+    calls = {"n": 0}
+
+    def fsync_fails_once(fd):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise OSError(5, "Input/output error")
+        real_fsync(fd)
+
+    monkeypatch.setattr(meal_log.os, "fsync", fsync_fails_once)
+    with pytest.raises(OSError, match="Meal log write failed"):
+        log.append("a", [entry(2)])
+    assert log.logs_for("a") == [entry(1)]
+
+    log.append("a", [entry(3)])  # later appends succeed
+    assert log.logs_for("a") == [entry(1), entry(3)]
+    log.close()
+
+    # the failed record was cut from the WAL, so it is not replayed
+    log = MealLog(str(tmp_path))
+    assert log.logs_for("a") == [entry(1), entry(3)]
+    log.close()
+
+
+def test_log_refuses_writes_if_failed_batch_cannot_be_cut(tmp_path, monkeypatch):
+    log = MealLog(str(tmp_path))
+
+    def fail(*args):
+        raise OSError(5, "Input/output error")
+
+    monkeypatch.setattr(meal_log.os, "fsync", fail)
+    monkeypatch.setattr(meal_log.os, "ftruncate", fail)
+    with pytest.raises(OSError, match="write failed"):
+        log.append("a", [entry(1)])
+    monkeypatch.undo()
+    with pytest.raises(OSError, match="unavailable"):
+        log.append("a", [entry(2)])
+    log.close()
+
+
+def test_concurrent_appends_are_all_durable(tmp_path):
+    log = MealLog(str(tmp_path))
+
+    def session(i):
+        for n in range(20):
+            log.append(f"owner{i}", [entry(n)])
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    log.close()
+
+    log = MealLog(str(tmp_path))
+    assert all(log.logs_for(f"owner{i}") == [entry(n) for n in range(20)] for i in range(8))
+    log.close()
+
+
+def test_open_log_reuses_the_open_instance(tmp_path):
+    log = open_log(str(tmp_path))
+    log.append("a", [entry(1)])
+    assert open_log(str(tmp_path / ".")) is log  # keyed by realpath
+    with pytest.raises(RuntimeError, match="already open in this process"):
+        MealLog(str(tmp_path))
+    log.close()
+
+    reopened = open_log(str(tmp_path))  # closed logs are dropped from the registry
+    assert reopened is not log
+    assert reopened.logs_for("a") == [entry(1)]
+    reopened.close()
+
+
+@pytest.mark.skipif(meal_log.fcntl is None, reason="directory lock needs fcntl")
+def test_second_process_is_refused(tmp_path):
+    log = MealLog(str(tmp_path))
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    child = subprocess.run(
+        [sys.executable, "-c", f"import sys; sys.path.insert(0, {repo!r}); import meal_log; meal_log.MealLog({str(tmp_path)!r})"],
+        capture_output=True, text=True,
+    )
+    assert child.returncode != 0
+    assert "already open in another process" in child.stderr
+    log.close()
+    MealLog(str(tmp_path)).close()  # free again once closed
@@ -0,0 +1,158 @@
+import pytest
+
+from nutrition import (
+    FOOD_DATABASE, FOOD_INDEX, FOOD_NAMES, KCAL_PER_GRAM, MACRO_GOAL_SPLIT, NUTRIENTS,
+    _best_food_match, _parse_item_fragment, estimate_from_text, log_nutrient_totals, macro_goals,
+    nutrient_totals, quantity_vector,
+)
+
+
+@pytest.mark.parametrize("text, qty, unit", [
+    ("3/4 cup kibble", 0.75, "cup"),
+    ("1/2 cup white rice", 0.5, "cup"),
+    ("1 1/2 cups rice", 1.5, "cup"),
+    ("2 1/4 cups kibble", 2.25, "cup"),
+    (".5 cup rice", 0.5, "cup"),
+    ("2.5 cups rice", 2.5, "cup"),
+    ("2 slices bread", 2.0, "slice"),
+    ("3 carrots", 3.0, "carrot"),
+])
+def test_parse_fractions_and_mixed_numbers(text, qty, unit):
+    parsed_qty, parsed_unit, _ = _parse_item_fragment(text)
+    assert parsed_qty == pytest.approx(qty)
+    assert parsed_unit == unit
+
+
+def test_fraction_calories():
+    result = estimate_from_text("3/4 cup kibble, 1/2 cup white rice, 1 1/2 cups rice", FOOD_DATABASE)
+    assert [it["qty_db_units"] for it in result["items"]] == pytest.approx([0.75, 0.5, 1.5])
+    assert result["total_kcal"] == pytest.approx(350 * 0.75 + 200 * 0.5 + 200 * 1.5)
+    assert result["unmatched"] == []
+
+
+# Query sample for _best_food_match: typed names and the food they must resolve to.
+MATCH_SAMPLE = {
+    "Boiled Chicken Breast": "Boiled Chicken Breast",
+    "boiled chicken": "Boiled Chicken Breast",
+    "chicken breast": "Boiled Chicken Breast",
+    "chicken thigh": "Chicken Thigh (Cooked, no skin)",
+    "ground beef": "Lean Ground Beef (Cooked)",
+    "lean beef": "Lean Ground Beef (Cooked)",
+    "turkey": "Turkey (Cooked, no skin)",
+    "ground turkey": "Turkey Mince (Cooked, lean)",
+    "salmon": "Salmon (Cooked)",
+    "white fish": "White Fish (Cooked, plain)",
+    "tuna": "Tuna (Canned in water)",
+    "eggs": "Hard Boiled Egg",
+    "scrambled egg": "Scrambled Egg (Plain)",
+    "tofu": "Plain Tofu (Firm, cooked)",
+    "pork loin": "Pork Loin (Cooked)",
+    "cooked rice": "White Rice (Cooked)",
+    "brown rice": "Brown Rice (Cooked)",
+    "oatmeal": "Oatmeal (Plain, Cooked)",
+    "porridge": "Oatmeal (Plain, Cooked)",
+    "sweet potato": "Sweet Potato (Boiled/Baked)",
+    "pasta": "Pasta (Plain, Cooked)",
+    "noodles": "Pasta (Plain, Cooked)",
+    "toast": "Bread (White/Wheat)",
+    "pumpkin puree": "Pumpkin (Pure canned)",
+    "carrot": "Carrot (Raw)",
+    "green beans": "Green Beans (Plain)",
+    "peas": "Peas (Green)",
+    "broccoli": "Broccoli (Steamed)",
+    "spinach": "Spinach (Cooked)",
+    "apple": "Apple (no seeds/core)",
+    "blueberries": "Blueberries",
+    "watermelon": "Watermelon (seedless)",
+    "plain yogurt": "Yogurt (Plain Greek)",
+    "greek yoghurt": "Yogurt (Plain Greek)",
+    "cottage cheese": "Cottage Cheese (Low-Fat)",
+    "cheddar": "Cheddar Cheese",
+    "PB": "Peanut Butter (Xylitol-free)",
+    "peanut butter": "Peanut Butter (Xylitol-free)",
+    "fish oil": "Salmon Oil",
+    "bone broth": "Bone Broth (No onion/garlic)",
+    "kibble": "Dry Kibble (Standard)",
+    "diet kibble": "Dry Kibble (Weight Mgmt)",
+    "wet food": "Wet Canned Food (Standard)",
+    "dog biscuit": "Dog Biscuit (Small)",
+    "dental chew": "Dental Stick (Medium)",
+    "bully stick": "Bully Stick (6 inch)",
+    "treats": "Training Treat (Small)",
+    "freeze dried bites": "Freeze-Dried Raw Bites",
+    "raisins": "Grapes/Raisins",
+    "dark chocolate": "Chocolate (Dark/Baking)",
+    "milk chocolate": "Chocolate (Milk)",
+    "xylitol gum": "Xylitol (Gum/Candy)",
+    "beer": "Alcohol",
+    "macadamia nuts": "Macadamia Nuts",
+    "chiken brest": "Boiled Chicken Breast",  # typo: difflib fallback
+    "whole wheat bread": "Bread (White/Wheat)",  # head noun wins over "Whole Wheat Pasta"
+    "celery stalk": "Celery",  # DB unit word in the name
+    "celery stalks": "Celery",
+    "organic peanut butter": "Peanut Butter (Xylitol-free)",  # unknown modifier
+    "chicken breast fillet": "Boiled Chicken Breast",
+}
+
+# Foods that are not in the database; sharing one word with a food is not a match.
+NO_MATCH_SAMPLE = [
+    "hot dog", "chicken liver", "beef jerky", "apple pie", "blueberry muffin",
+    "chicken rice", "fish sticks", "turkey sandwich", "rice cake", "cheese pizza",
+    "egg noodles", "peanut butter cookie",
+]
+
+
+@pytest.mark.parametrize("query, expected", MATCH_SAMPLE.items())
+def test_best_food_match(query, expected):
+    assert _best_food_match(query, list(FOOD_DATABASE)) == expected
+
+
+@pytest.mark.parametrize("query", NO_MATCH_SAMPLE)
+def test_partial_overlap_is_unmatched(query):
+    assert _best_food_match(query, list(FOOD_DATABASE)) is None
+
+
+@pytest.mark.parametrize("text, food, qty", [
+    ("1 slice whole wheat bread", "Bread (White/Wheat)", 1.0),
+    ("2 celery stalks", "Celery", 2.0),
+    ("1 organic peanut butter", "Peanut Butter (Xylitol-free)", 1.0),
+])
+def test_estimate_matches_with_units_and_modifiers(text, food, qty):
+    result = estimate_from_text(text, FOOD_DATABASE)
+    assert [(it["name_matched"], it["qty_db_units"]) for it in result["items"]] == [(food, qty)]
+
+
+def test_quantity_vector_sums_repeats_and_skips_unknown_foods():
+    vec = quantity_vector([0, 2, 0, -1], [1.0, 0.5, 2.0, 9.0])
+    assert vec.shape == (len(FOOD_NAMES),)
+    assert vec[0] == pytest.approx(3.0) and vec[2] == pytest.approx(0.5)
+    assert vec.sum() == pytest.approx(3.5)
+
+
+def test_nutrient_totals_matches_per_food_sum():
+    foods = ["Dry Kibble (Standard)", "White Rice (Cooked)", "Dry Kibble (Standard)"]
+    qty = [0.5, 2.0, 1.0]
+    totals = nutrient_totals([FOOD_INDEX[f] for f in foods], qty)
+    expected = [sum(FOOD_DATABASE[f].get(n, 0.0) * q for f, q in zip(foods, qty)) for n in NUTRIENTS]
+    assert totals == pytest.approx(expected)
+
+
+def test_macro_goals_split_the_calorie_goal():
+    goals = macro_goals(1000)
+    kcal = [goals[i] * KCAL_PER_GRAM[n] for i, n in enumerate(NUTRIENTS[1:])]
+    assert kcal == pytest.approx([1000 * MACRO_GOAL_SPLIT[n] for n in NUTRIENTS[1:]])
+    assert sum(kcal) == pytest.approx(1000)
+
+
+def test_log_nutrient_totals_falls_back_to_quantity_string():
+    logs = [
+        {"food": "Dry Kibble (Standard)", "quantity": "1 cup", "qty_db": 0.75},
+        {"food": "Dry Kibble (Standard)", "quantity": "0.50 cup"},  # logged before qty_db existed
+        {"food": "Banana", "quantity": "2 medium banana", "qty_db": None},
+        {"food": "Not In Catalog", "quantity": "3 cup", "qty_db": 3},
+        {"food": "Banana", "quantity": "some"},
+    ]
+    totals = log_nutrient_totals(logs)
+    kibble, banana = FOOD_DATABASE["Dry Kibble (Standard)"], FOOD_DATABASE["Banana"]
+    assert totals[0] == pytest.approx(kibble["calories"] * 1.25 + banana["calories"] * 2)
+    assert log_nutrient_totals([]) == pytest.approx([0.0] * len(NUTRIENTS))
@@ -0,0 +1,71 @@
+import csv
+import io
+
+import pytest
+
+import screening
+
+
+def rows(text: str, kind: str) -> list[tuple[int, str]]:
+    return list(screening.iter_rows(io.StringIO(text), kind))
+
+
+def test_iter_rows_csv_with_header_uses_text_columns():
+    text = "date,food,calories\n2024-01-01,grapes,70\n2024-01-02,kibble,350\n"
+    assert rows(text, "csv") == [(1, "grapes"), (2, "kibble")]
+
+
+def test_iter_rows_headerless_csv_keeps_first_row():
+    assert rows("grapes\nchocolate\nkibble\n", "csv") == [(1, "grapes"), (2, "chocolate"), (3, "kibble")]
+
+
+def test_iter_rows_csv_without_text_column_screens_every_field():
+    assert rows("chicken,grapes\nrice,carrot\n", "csv") == [(1, "chicken, grapes"), (2, "rice, carrot")]
+
+
+def test_iter_rows_empty_csv():
+    assert rows("", "csv") == []
+
+
+def test_iter_rows_jsonl_including_malformed_lines():
+    text = '{"meal": "chicken and rice", "calories": 300}\n\nnot json, grapes\n["onion"]\n'
+    assert rows(text, "jsonl") == [(1, "chicken and rice"), (3, "not json, grapes"), (4, "['onion']")]
+
+
+def test_iter_rows_text_skips_blank_lines():
+    assert rows("kibble\n\n  grapes  \n", "text") == [(1, "kibble"), (3, "grapes")]
+
+
+def test_detect_kind():
+    assert [screening.detect_kind(n) for n in ("a.CSV", "b.jsonl", "c.ndjson", "d.txt")] == ["csv", "jsonl", "jsonl", "text"]
+
+
+def test_screen_text_flags_keywords_and_toxic_db_foods():
+    terms, warnings = screening.screen_text("1 cup kibble, a handful of raisins + chocolate")
+    assert terms == ["chocolate", "raisin", "raisins", "Chocolate (Milk)"]  # keywords, then DB matches
+    assert len(warnings) == 3 and len(set(warnings)) == 3
+
+
+def test_screen_text_clean_row():
+    assert screening.screen_text("1 cup kibble, 2 carrots") == ([], [])
+
+
+def test_report_to_csv():
+    flagged = [{"row": 2, "text": "grapes, kibble", "terms": ["grape", "Grapes/Raisins"], "warnings": ["w1", "w2"]}]
+    report = list(csv.DictReader(io.StringIO(screening.report_to_csv(flagged))))
+    assert report == [{"row": "2", "text": "grapes, kibble", "terms": "grape; Grapes/Raisins", "warnings": "w1; w2"}]
+
+
+def test_screen_file_counts_every_row_of_headerless_csv():
+    result = screening.screen_file(io.BytesIO(b"grapes\nchocolate\nkibble\n"), "csv", workers=1)
+    assert result["rows"] == 3
+    assert [r["row"] for r in result["flagged"]] == [1, 2]
+
+
+def test_parallel_matches_serial():
+    lines = ["1 cup kibble", "grapes and rice", "2 carrots", "chocolate cake", "boiled chicken", "onion rings"] * 50
+    data = "\n".join(lines).encode()
+    serial = list(screening.screen_rows(screening.iter_rows(io.StringIO(data.decode()), "text"), workers=1))
+    parallel = list(screening.screen_rows(screening.iter_rows(io.StringIO(data.decode()), "text"), workers=2, chunk_rows=40))
+    assert parallel == serial
+    assert len(serial) == 150
@@ -0,0 +1,53 @@
+import os
+import time
+
+import pytest
+
+import session_snapshot
+
+PROFILE = {"name": "Rex", "weight_kg": 30.0}
+CHAT = [{"role": "user", "content": "Hi"}]
+
+
+def test_round_trip(tmp_path):
+    session_snapshot.save_snapshot(str(tmp_path), "owner1", {"profile": PROFILE, "chat": CHAT})
+    data = session_snapshot.load_snapshot(str(tmp_path), "owner1")
+    assert data["profile"] == PROFILE and data["chat"] == CHAT
+    assert session_snapshot.load_snapshot(str(tmp_path), "nobody") is None
+
+
+def test_invalid_owner_id_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        session_snapshot.save_snapshot(str(tmp_path), "../etc", {"profile": PROFILE, "chat": []})
+
+
+def test_signature_tracks_profile_and_chat():
+    base = session_snapshot.signature(PROFILE, CHAT)
+    assert session_snapshot.signature(dict(PROFILE), list(CHAT)) == base
+    assert session_snapshot.signature({**PROFILE, "name": "Max"}, CHAT) != base
+    assert session_snapshot.signature(PROFILE, CHAT + [{"role": "assistant", "content": "Hello"}]) != base
+
+
+def test_prune_removes_only_old_snapshots(tmp_path):
+    for owner in ("old", "recent"):
+        session_snapshot.save_snapshot(str(tmp_path), owner, {"profile": PROFILE, "chat": []})
+    (tmp_path / "stray.tmp").write_bytes(b"")
+    (tmp_path / "notes.txt").write_text("keep me")
+    long_ago = time.time() - 100 * 86400
+    for name in ("old.snap", "stray.tmp", "notes.txt"):
+        os.utime(tmp_path / name, (long_ago, long_ago))
+
+    assert session_snapshot.prune_snapshots(str(tmp_path), 90 * 86400) == 2
+    assert sorted(os.listdir(tmp_path)) == ["notes.txt", "recent.snap"]
+
+
+def test_restoring_a_snapshot_keeps_it_from_expiring(tmp_path):
+    session_snapshot.save_snapshot(str(tmp_path), "owner1", {"profile": PROFILE, "chat": []})
+    long_ago = time.time() - 100 * 86400
+    os.utime(tmp_path / "owner1.snap", (long_ago, long_ago))
+    assert session_snapshot.load_snapshot(str(tmp_path), "owner1") is not None
+    assert session_snapshot.prune_snapshots(str(tmp_path), 90 * 86400) == 0
+
+
+def test_prune_missing_directory(tmp_path):
+    assert session_snapshot.prune_snapshots(str(tmp_path / "missing"), 1) == 0